@@ -90,6 +90,18 @@ class MuSeqPoseConfig(PoseEstimationConfig):
         self.reprojection_toolbox_enabled = not self.calibration_toolbox_enabled and self.data_dictionary.get(
             'reprojection_toolbox', False) and all(
             [self.annotation_views[annotation].view is not None for annotation in self.annotation_views]) and all([view.is_dlt_valid() for view in self.views.values()])
+        playback = self.data_dictionary.get('playback', {})
+        self.prefetch_buffer_size = int(playback.get('prefetch_buffer_size', 0))
+        self.frame_cache_size = int(playback.get('frame_cache_size', 0))
+        self.gop_size = max(1, int(playback.get('gop_size', 30)))
+        self.seek_index_enabled = bool(playback.get('seek_index', True))
+        self.realtime_playback = bool(playback.get('realtime', False))
+        self.proxy_scale = float(playback.get('proxy_scale', 0))
+        self.batched_skeleton_rendering = bool(playback.get('batched_skeleton', False))
+        annotation_loading = self.data_dictionary.get('annotation_loading', {})
+        self.lazy_annotation_loading = bool(annotation_loading.get('lazy', False))
+        self.annotation_chunk_size = max(1, int(annotation_loading.get('chunk_size', 4096)))
+        self.annotation_chunk_cache_mb = float(annotation_loading.get('chunk_cache_mb', 256))
         self.behaviours = self.data_dictionary.get('behaviours', [])
         if len(self.behaviours) == 0:
             self.behaviours.append("NA")
@@ -118,5 +130,15 @@ class MuSeqPoseConfig(PoseEstimationConfig):
         data_dict['calibration_toolbox']['views'] = {
             view: {point: self.calibration_static_point_locations[view][point] for point in
                    self.calibration_static_points} for view in self.views}
+        data_dict['playback'] = {'prefetch_buffer_size': self.prefetch_buffer_size,
+                                 'frame_cache_size': self.frame_cache_size,
+                                 'gop_size': self.gop_size,
+                                 'seek_index': self.seek_index_enabled,
+                                 'realtime': self.realtime_playback,
+                                 'proxy_scale': self.proxy_scale,
+                                 'batched_skeleton': self.batched_skeleton_rendering}
+        data_dict['annotation_loading'] = {'lazy': self.lazy_annotation_loading,
+                                           'chunk_size': self.annotation_chunk_size,
+                                           'chunk_cache_mb': self.annotation_chunk_cache_mb}
         data_dict['plots'] = {plot: self.plots[plot].export_dict() for plot in self.plots}
         return data_dict
@@ -27,6 +27,12 @@ class PlayerInterface(ABC):
     def seek(self, frame_number):
         pass
 
+    def skip(self, frame_number):
+        """
+        Moves playback forward to the given frame without rendering the frames in between.
+        """
+        self.seek(frame_number)
+
     @abstractmethod
     def get_number_of_frames(self):
         pass
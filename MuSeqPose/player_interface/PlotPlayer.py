@@ -12,7 +12,6 @@ from vispy.visuals.transforms import STTransform,MatrixTransform
 from MuSeqPose.config import PlotConfig, ReconstructionPlotConfig, LinePlotConfig
 from MuSeqPose.player_interface.PlayerInterface import PlayerInterface
 from MuSeqPose.utils.session_manager import SessionManager
-from cvkit.pose_estimation.data_readers import initialize_datastore_reader
 from cvkit.pose_estimation.utils import get_spherical_coordinates
 
 
@@ -61,7 +60,8 @@ class PlotPlayer(PlayerInterface, ABC):
         super(PlotPlayer, self).__init__(session_manager, view_name, view_data)
         columns = view_data.annotation_columns if view_data.annotation_columns is not None else self.config.body_parts
         path = os.path.join(self.config.output_folder, view_data.annotation_file)
-        self.data_store = initialize_datastore_reader(columns, path, view_data.annotation_file_flavor)
+        self.data_store = self.session_manager.get_data_store(columns, path, view_data.annotation_file_flavor,
+                                                              journaled=False)
         self.scene_canvas = None
 
     def get_widget(self):
@@ -1,33 +1,190 @@
+from threading import Thread
+
 from MuSeqPose.player_interface.PlayerInterface import PlayerInterface
+from MuSeqPose.utils.frame_cache import FrameCache
+from MuSeqPose.utils.frame_prefetcher import FramePrefetcher
+from MuSeqPose.utils.proxy_transcoder import ProxyReader, ProxyTranscoder, get_proxy_path, get_video_size, \
+    is_proxy_valid
+from MuSeqPose.utils.seek_index import load_seek_index, get_seek_index_path
 from MuSeqPose.utils.session_manager import SessionManager
 from cvkit.pose_estimation.config import AnnotationConfig
-from cvkit.pose_estimation.data_readers import initialize_datastore_reader
 from cvkit.video_readers import initialize_video_reader
 
 
 class VideoPlayer(PlayerInterface):
 
     def release(self):
+        if self.proxy_transcoder is not None:
+            self.proxy_transcoder.cancel()
+        if self.proxy_reader is not None:
+            self.proxy_reader.release()
+        if self.frame_prefetcher is not None:
+            self.frame_prefetcher.stop()
+        if self.frame_cache is not None:
+            self.frame_cache.clear()
         self.video_reader.release()
 
     def __init__(self, session_manager: SessionManager, view_name, view_data: AnnotationConfig):
         super(VideoPlayer, self).__init__(session_manager, view_name, view_data)
         self.video_reader = initialize_video_reader(view_data.video_file, self.config.framerate, view_data.video_reader)
-        self.data_store = initialize_datastore_reader(self.config.body_parts, view_data.annotation_file,
-                                                      view_data.annotation_file_flavor)
+        self.data_store = self.session_manager.get_data_store(self.config.body_parts, view_data.annotation_file,
+                                                              view_data.annotation_file_flavor)
         self.session_manager.register_data_reader(view_name, self.data_store)
         self.session_manager.register_video_reader(view_name, self.video_reader)
+        self.session_manager.register_video_player(view_name, self)
+        self.frame_prefetcher = None
+        if self.config.prefetch_buffer_size > 0:
+            self.frame_prefetcher = FramePrefetcher(self.video_reader, self.config.prefetch_buffer_size)
+        self.frame_cache = None
+        if self.config.frame_cache_size > 0:
+            self.frame_cache = FrameCache(self.config.frame_cache_size * 1024 * 1024)
+        # Index of the frame shown by the next render call and of the frame the decoder will produce next.
+        self.next_index = 0
+        self.stream_index = 0
         self.current_frame = None
+        # Parts of data_point edited since it was loaded, only these are written back to the data store.
+        self.dirty_parts = set()
+        self.dirty_behaviour = False
+        self.seek_index = None
+        if self.config.seek_index_enabled:
+            Thread(target=self.init_seek_index, daemon=True).start()
+        # Frames decoded from the proxy are drawn stretched to the full resolution so keypoints keep their coordinates.
+        self.proxy_transcoder = None
+        self.proxy_reader = None
+        self.use_proxy = False
+        self.video_size = None
+        self.display_size = None
+        if self.config.proxy_scale > 0:
+            Thread(target=self.init_proxy, daemon=True).start()
 
-    def render_next_frame(self, image_viewer):
+    def init_seek_index(self):
+        self.seek_index = load_seek_index(self.view_data.video_file,
+                                          get_seek_index_path(self.config.output_folder, self.view_name))
+
+    def init_proxy(self):
+        video_path = self.view_data.video_file
+        proxy_path = get_proxy_path(self.config.output_folder, self.view_name, self.config.proxy_scale)
+        try:
+            if not is_proxy_valid(video_path, proxy_path):
+                self.proxy_transcoder = ProxyTranscoder(video_path, proxy_path, self.config.proxy_scale)
+                if not self.proxy_transcoder.run():
+                    return
+            self.video_size = get_video_size(video_path)
+            self.proxy_reader = ProxyReader(proxy_path)
+        except Exception as ex:
+            print(f'Could not create proxy for {video_path}: {ex}')
+
+    def set_proxy_mode(self, enabled):
+        """
+        Switches decoding between the proxy and the full-resolution video. Leaving proxy mode reloads the current frame
+        at full resolution.
+
+        :return: Whether the current frame was replaced.
+        """
+        self.use_proxy = enabled and self.proxy_reader is not None
+        if self.use_proxy or self.display_size is None:
+            return False
+        index, frame = self.read_frame(self.frame_number)
+        if frame is None:
+            return False
+        self.current_frame = frame
+        self.display_size = None
+        return True
+
+    def read_next_frame(self):
+        if self.frame_prefetcher is not None:
+            return self.frame_prefetcher.next_frame()
         frame = self.video_reader.next_frame()
+        return self.video_reader.get_current_index(), frame
+
+    def seek_stream(self, index):
+        keyframe = index if self.seek_index is None else self.seek_index.get_keyframe(index)
+        if keyframe <= self.stream_index <= index:
+            # Target is ahead in the current GOP, decoding forward is cheaper than seeking back to its keyframe.
+            keyframe = self.stream_index
+        if keyframe != self.stream_index:
+            if self.frame_prefetcher is not None:
+                self.frame_prefetcher.seek(keyframe)
+            else:
+                self.video_reader.seek_pos(keyframe)
+            self.stream_index = keyframe
+        # Decode forward from the keyframe instead of relying on the container to land on the exact frame.
+        while self.stream_index < index:
+            stream_index, frame = self.read_next_frame()
+            if frame is None:
+                break
+            self.stream_index = stream_index + 1
+            if self.frame_cache is not None:
+                self.frame_cache.put(stream_index, frame)
+
+    def read_frame(self, index):
+        if self.frame_cache is not None:
+            frame = self.frame_cache.get(index)
+            if frame is not None:
+                return index, frame
+        if index != self.stream_index:
+            self.seek_stream(index)
+        index, frame = self.read_next_frame()
         if frame is not None:
-            if self.data_point is not None:
-                self.data_store.set_skeleton(self.frame_number, self.data_point)
-            self.frame_number = self.video_reader.get_current_index()
-            self.data_point = self.data_store.get_skeleton(self.frame_number)
-            image_viewer.draw_frame(frame)
-            self.current_frame = frame
+            self.stream_index = index + 1
+            if self.frame_cache is not None:
+                self.frame_cache.put(index, frame)
+        return index, frame
+
+    def decode_frame(self):
+        """
+        Decodes the next frame without touching the data store or any widget, so it can run off the GUI thread.
+
+        :return: Index and image of the frame, the image is None past the end of the video.
+        """
+        if self.use_proxy:
+            return self.next_index, self.proxy_reader.read(self.next_index)
+        return self.read_frame(self.next_index)
+
+    def load_frame(self, index, frame):
+        """
+        Makes a decoded frame the current one. Pending edits are committed and the annotation of the frame is loaded,
+        so this runs on the GUI thread.
+
+        :return: Whether a new frame was decoded.
+        """
+        if frame is None:
+            return False
+        self.display_size = self.video_size if self.use_proxy else None
+        self.commit_data_point()
+        self.frame_number = index
+        self.next_index = index + 1
+        self.data_point = self.data_store.get_skeleton(self.frame_number)
+        self.current_frame = frame
+        return True
+
+    def decode_next_frame(self):
+        return self.load_frame(*self.decode_frame())
+
+    def mark_dirty(self, part=None):
+        """
+        Marks a part of the working skeleton as edited, or its behaviours when no part is given.
+        """
+        if part is None:
+            self.dirty_behaviour = True
+        else:
+            self.dirty_parts.add(part)
+
+    def commit_data_point(self):
+        if self.data_point is not None:
+            for part in self.dirty_parts:
+                self.data_store.set_part(self.frame_number, self.data_point[part])
+            if self.dirty_behaviour:
+                self.data_store.set_behaviour(self.frame_number, self.data_point.behaviour)
+        self.dirty_parts.clear()
+        self.dirty_behaviour = False
+
+    def present_frame(self, image_viewer):
+        image_viewer.draw_frame(self.current_frame, self.display_size)
+
+    def render_next_frame(self, image_viewer):
+        if self.decode_next_frame():
+            self.present_frame(image_viewer)
         return self.frame_number
 
     def render_previous_frame(self):
@@ -35,7 +192,60 @@ class VideoPlayer(PlayerInterface):
             self.seek(self.frame_number - 1)
 
     def seek(self, frame_number):
-        self.video_reader.seek_pos(max(0, frame_number))
+        self.next_index = max(0, frame_number)
+        if self.frame_cache is not None and not self.use_proxy and self.next_index not in self.frame_cache:
+            self.fill_frame_cache(self.next_index)
+
+    def skip(self, frame_number):
+        # Unlike seek, do not refill the frame cache; dropped frames are decoded forward from the current stream.
+        self.next_index = max(0, frame_number)
+
+    def get_keyframe(self, index):
+        if self.seek_index is not None:
+            return self.seek_index.get_keyframe(index)
+        return index - index % self.config.gop_size
+
+    def get_next_keyframe(self, index):
+        if self.seek_index is not None:
+            return self.seek_index.get_next_keyframe(index)
+        return self.get_keyframe(index) + self.config.gop_size
+
+    def get_frame(self, index):
+        return self.read_frame(index)[1]
+
+    def fill_frame_cache(self, index):
+        """
+        Decodes the GOP around the index into the frame cache, keeping the frames closest to the index when the GOP
+        does not fit in the memory budget.
+        """
+        start = self.get_keyframe(index)
+        end = min(self.get_next_keyframe(index), self.get_number_of_frames())
+        window_start = start
+        capacity = None
+        self.seek_stream(start)
+        while self.stream_index < end:
+            stream_index, frame = self.read_next_frame()
+            if frame is None:
+                break
+            self.stream_index = stream_index + 1
+            if capacity is None:
+                capacity = self.frame_cache.capacity(frame)
+                if capacity < 1:
+                    break
+                window_start = max(start, index - capacity // 2)
+                end = min(end, window_start + capacity)
+            if stream_index >= window_start:
+                self.frame_cache.put(stream_index, frame)
 
     def get_number_of_frames(self):
         return self.video_reader.get_number_of_frames()
+
+    def get_prefetch_stats(self):
+        if self.frame_prefetcher is not None:
+            return self.frame_prefetcher.get_stats()
+        return None
+
+    def get_cache_stats(self):
+        if self.frame_cache is not None:
+            return self.frame_cache.get_stats()
+        return None
@@ -1,19 +1,19 @@
-import glob
 import os
 import sys
 import traceback
 from random import randint
 
 import numpy as np
-from PySide2.QtCore import QFile, QCoreApplication, Qt
+from PySide2.QtCore import QFile, QCoreApplication, Qt, QEvent
 from PySide2.QtUiTools import QUiLoader
-from PySide2.QtWidgets import QApplication, QFileDialog, QMessageBox
+from PySide2.QtWidgets import QApplication, QFileDialog, QMessageBox, QProgressDialog
 
-import cvkit.pose_estimation.reconstruction.DLT as DLT
 from MuSeqPose import get_resource
 from MuSeqPose.config import MuSeqPoseConfig
 from MuSeqPose.player_interface.PlotPlayer import ReconstructionPlayer, LinePlotPlayer
 from MuSeqPose.player_interface.VideoPlayer import VideoPlayer
+from MuSeqPose.utils.frame_store import load_frame_indices, load_legacy_frame_indices
+from MuSeqPose.utils.reconstruction import reproject_range
 from MuSeqPose.utils.session_manager import SessionManager
 from MuSeqPose.widgets.AlignmentWidget import AlignmentDialog
 from MuSeqPose.widgets.AnnotationWidget import AnnotationWidget
@@ -35,6 +35,7 @@ class MuSeqPoseKit(QApplication):
         loader = QUiLoader()
         self.ui = loader.load(ui_file)
         self.ui.show()
+        self.ui.installEventFilter(self)
         self.ui.actionLoad.triggered.connect(self.open_project)
         self.ui.setWindowTitle('MuSeq Pose Kit')
         self.ui.actionSave.triggered.connect(self.save_files)
@@ -53,9 +54,15 @@ class MuSeqPoseKit(QApplication):
         self.session_manager = None
         self.global_frame_number = 0
 
+    def eventFilter(self, watched, event):
+        if watched is self.ui and event.type() == QEvent.Close:
+            self.reset_app()
+        return super().eventFilter(watched, event)
+
     def save_config_event(self):
         save_config(self.config.path, self.config.export_dict())
     def align_axes(self):
+        self.commit_edits()
         widget = AlignmentDialog(self.ui,self.session_manager)
         widget.show()
     def import_dlt_coefficients(self):
@@ -67,6 +74,7 @@ class MuSeqPoseKit(QApplication):
             try:
                 order = open(order, 'r')
                 self.config = update_config_dlt_coeffs(self.config, file, order.read().strip().split(' '))
+                self.session_manager.invalidate_dlt_systems()
                 save_config(self.config.path, self.config.export_dict())
                 if all([view.is_dlt_valid() for view in self.config.views.values()]):
                     self.ui.actionAxes_Aignment.setEnabled(True)
@@ -76,28 +84,44 @@ class MuSeqPoseKit(QApplication):
             QMessageBox.information(self.ui, 'Success', f'DLT Coefficients Loaded!')
 
     def generate_calibration_data(self):
+        self.commit_edits()
         resolution = list(self.config.views.values())[0].resolution
-        if not os.path.exists(os.path.join(self.config.output_folder, 'calibration', 'candidates')):
+        key = list(self.config.views.keys())[0]
+        candidates_path = os.path.join(self.config.output_folder, 'calibration', 'candidates', key)
+        candidates = load_frame_indices(candidates_path)
+        if candidates is None:
+            # Candidates curated before the frame store, the store is built from them.
+            candidates = load_legacy_frame_indices(candidates_path)
+        if candidates is None:
             candidates = pick_calibration_candidates(self.config, self.session_manager.get_2D_data_readers(),
                                                      resolution,
                                                      int(resolution[0] * 0.01),max_frames=30)
-        else:
-            key = list(self.config.views.keys())[0]
-            candidates = [int(os.path.basename(file_name).split('.')[0]) for file_name in
-                          glob.glob(os.path.join(self.config.output_folder, 'calibration', 'candidates', key, '*.png'))]
         if len(candidates) < 7:
             QMessageBox.warning(self.ui, 'Error', 'Could not find at least 7 common annotated-frame instances.')
             return
         QMessageBox.information(self.ui, 'Candidates Found!', f'{len(candidates)} candidates found for calibration!')
         dialog = CalibrationDialog(self.ui, self.session_manager, candidates)
 
-    def reset_app(self):
+    def reset_app(self, discard_edits=None):
+        """
+        :param discard_edits: Drop the annotation edits that were not saved. If None, the user is asked when there are
+                              any.
+        """
+        if self.session_manager is not None:
+            self.commit_edits()
+            if discard_edits is None:
+                discard_edits = self.session_manager.has_unsaved_edits() and QMessageBox.question(
+                    self.ui, "Unsaved Edits", "Save the annotation edits?") == QMessageBox.No
         for idx, view in enumerate(self.views):
+            if isinstance(view, SyncViewWidget):
+                view.release()
             self.ui.viewTabWidget.removeTab(idx)
             view.deleteLater()
         for player in self.players.values():
             player.release()
             del player
+        if self.session_manager is not None:
+            self.session_manager.release(discard_edits)
         self.players.clear()
         self.views.clear()
         self.file_name = None
@@ -109,7 +133,16 @@ class MuSeqPoseKit(QApplication):
         self.session_manager = None
         self.global_frame_number = 0
 
+    def commit_edits(self):
+        for view in self.views:
+            if isinstance(view, AnnotationWidget):
+                view.commit_overwrite()
+        for player in self.players.values():
+            if isinstance(player, VideoPlayer):
+                player.commit_data_point()
+
     def save_files(self, event=None):
+        self.commit_edits()
         for player in self.players.values():
             player.data_store.save_file()
 
@@ -122,10 +155,10 @@ class MuSeqPoseKit(QApplication):
 
     def reload_data(self):
         if self.file_name:
-            btn = QMessageBox.question(self.ui, "Reload Data", "Are you sure?")
+            btn = QMessageBox.question(self.ui, "Reload Data", "Unsaved edits will be discarded. Are you sure?")
             if btn == QMessageBox.Yes:
                 fname = self.file_name
-                self.reset_app()
+                self.reset_app(discard_edits=True)
                 self.file_name = fname
                 self.load_data()
 
@@ -148,6 +181,7 @@ class MuSeqPoseKit(QApplication):
             play_controller.update_status.connect(self.update_status_bar)
             self.views.append(play_controller)
             play_controller.reproject.connect(self.reproject)
+            play_controller.reproject_range.connect(self.reproject_range)
             self.ui.viewTabWidget.addTab(play_controller, view)
         for plot in self.config.plots:
             if self.config.plots[plot].type == "Reconstruction":
@@ -167,6 +201,8 @@ class MuSeqPoseKit(QApplication):
             self.ui.actionAxes_Aignment.setEnabled(True)
         self.views.append(pipeline_widget)
         self.ui.viewTabWidget.addTab(pipeline_widget, "Pipeline")
+        if self.config.reprojection_toolbox_enabled:
+            self.session_manager.get_reprojection_error_index()
         self.current_view_index = 0
         self.ui.viewTabWidget.currentChanged.connect(self.change_view)
 
@@ -186,24 +222,67 @@ class MuSeqPoseKit(QApplication):
 
     def reproject(self, view_name, frame_number, view_candidates, part_candidates):
         list_of_views = list(self.config.views.keys())
+        source_system = self.session_manager.get_dlt_system(view_candidates)
+        target_system = self.session_manager.get_dlt_system(list_of_views)
+        self.commit_edits()
         view_indices = [list_of_views.index(view) for view in view_candidates]
-        dlt_coefficients_superset = np.array([self.config.views[view].dlt_coefficients for view in list_of_views])
-        dlt_coefficients = dlt_coefficients_superset[view_indices, :]
-        num_views = len(view_candidates)
         skeletons = [self.views[idx].video_player.data_store.get_skeleton(frame_number) for idx in view_indices]
-        for part in part_candidates:
-            _2d_parts = [sk[part] for sk in skeletons]
-            _3d_part = DLT.DLTrecon(3, num_views, dlt_coefficients, _2d_parts)
-            reprojected_parts = DLT.DLTdecon(dlt_coefficients_superset, _3d_part, 3, dlt_coefficients_superset.shape[0])
+        _2d_parts = np.array([[np.asarray(sk[part])[:2] for sk in skeletons] for part in part_candidates])
+        reprojected_parts = target_system.project(source_system.reconstruct(_2d_parts))
+        for part_index, part in enumerate(part_candidates):
             for i in range(len(list_of_views)):
                 original_part = self.views[i].video_player.data_store.get_part(frame_number, part)
-                original_part[:2] = reprojected_parts[0][i * 2:i * 2 + 2]
+                original_part[:2] = reprojected_parts[part_index, i]
                 original_part.likelihood = self.config.threshold
-                self.views[i].video_player.data_point[part] = original_part
-                self.views[i].video_player.data_store.set_part(frame_number, original_part)
+                video_player = self.views[i].video_player
+                if video_player.frame_number == frame_number:
+                    video_player.data_point[part] = original_part
+                    video_player.mark_dirty(part)
+                else:
+                    video_player.data_store.set_part(frame_number, original_part)
         self.views[list_of_views.index(view_name)].render_next_frame(redraw=True)
         pass
 
+    def reproject_range(self, view_name, start, end, view_candidates, part_candidates, batch_size=1024):
+        """
+        Reprojects parts over frames [start, end). Each batch of frames is reconstructed from the source views in one
+        vectorized pass and written to every annotation view with one block write per part. Frames where a part is
+        below the threshold in any source view are left untouched. Batches written before a cancel are kept.
+        """
+        self.commit_edits()
+        targets = [view for view in self.config.annotation_views if self.config.annotation_views[view].view is not None]
+        source_system = self.session_manager.get_dlt_system(
+            [self.config.annotation_views[view].view for view in view_candidates])
+        target_system = self.session_manager.get_dlt_system([self.config.annotation_views[view].view for view in targets])
+        progress = QProgressDialog('Reprojecting...', 'Cancel', 0, end - start, self.ui)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)
+        for batch_start in range(start, end, batch_size):
+            batch_end = min(batch_start + batch_size, end)
+            source_slices = [self.players[view].data_store.get_slice((batch_start, batch_end), part_candidates)
+                             for view in view_candidates]
+            projected, valid = reproject_range(source_slices, source_system, target_system, self.config.threshold)
+            for target_index, view in enumerate(targets):
+                data_store = self.players[view].data_store
+                # Coordinates past the first two keep their stored values, like the single frame reprojection.
+                coordinates, _ = data_store.get_slice((batch_start, batch_end), part_candidates)
+                coordinates[..., :2] = projected[target_index]
+                for idx, part in enumerate(part_candidates):
+                    frames = np.nonzero(valid[:, idx])[0]
+                    if len(frames) > 0:
+                        data_store.set_part_block(frames + batch_start, part,
+                                                  coordinates[frames, idx, :data_store.part_dimensions],
+                                                  self.config.threshold)
+            progress.setValue(batch_end - start)
+            if progress.wasCanceled():
+                break
+        progress.close()
+        for view in targets:
+            video_player = self.players[view]
+            if start <= video_player.frame_number < end:
+                video_player.data_point = video_player.data_store.get_skeleton(video_player.frame_number)
+        self.views[list(self.config.annotation_views).index(view_name)].render_next_frame(redraw=True)
+
     def update_status_bar(self, status):
         self.ui.status.setText(f'<html><p style="font-weight:500">{status}</p></html>')
 
@@ -1,7 +1,9 @@
-from PySide2.QtCore import Signal
+import numpy as np
+from PySide2.QtCore import Signal, QLineF, QRectF
 from PySide2.QtGui import Qt, QColor, QBrush, QPen
 from PySide2.QtWidgets import QGraphicsLineItem, QGraphicsEllipseItem, QGraphicsItem
 
+from MuSeqPose.utils.marker_index import MarkerIndex
 from MuSeqPose.utils.session_manager import SessionManager
 from cvkit.pose_estimation import Skeleton
 
@@ -21,6 +23,89 @@ class Marker(QGraphicsEllipseItem):
         self.setFlag(QGraphicsItem.ItemIsMovable, True)
 
 
+class SkeletonItem(QGraphicsItem):
+
+    def __init__(self, names, colors, bones, marker_size=4):
+        """
+        Paints every marker and bone of a skeleton in one paint call from a coordinate array. Hit tests and tooltips are
+        answered by a :py:class:`MarkerIndex` over the array.
+
+        :param bones: Pairs of part indices.
+        """
+        super(SkeletonItem, self).__init__()
+        self.names = list(names)
+        self.brushes = [QBrush(QColor.fromRgb(*color)) for color in colors]
+        self.bones = np.array(bones, dtype=np.int64).reshape(-1, 2)
+        self.marker_size = marker_size
+        self.marker_offset = marker_size // 2
+        self.bone_pen = QPen(Qt.white, 1, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        self.selected_pen = QPen(Qt.SolidLine)
+        self.coordinates = np.zeros((len(self.names), 2))
+        self.likelihood = np.zeros((len(self.names),))
+        self.visible = np.zeros((len(self.names),), dtype=bool)
+        self.selected = np.zeros((len(self.names),), dtype=bool)
+        self.bounds = QRectF()
+        self.marker_index = MarkerIndex()
+        self.setAcceptHoverEvents(True)
+
+    def set_points(self, coordinates, likelihood, visible):
+        """
+        :param coordinates: Array of shape (parts, 2).
+        :param likelihood: Array of shape (parts,).
+        :param visible: Mask of the parts to draw.
+        """
+        self.prepareGeometryChange()
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        self.likelihood = np.asarray(likelihood, dtype=np.float64)
+        self.visible = np.asarray(visible, dtype=bool)
+        self.marker_index.set_points(self.coordinates, self.visible)
+        if np.any(self.visible):
+            low = self.coordinates[self.visible].min(axis=0) - self.marker_size
+            high = self.coordinates[self.visible].max(axis=0) + self.marker_size
+            self.bounds = QRectF(low[0], low[1], high[0] - low[0], high[1] - low[1])
+        else:
+            self.bounds = QRectF()
+        self.update()
+
+    def set_selected(self, idx, state):
+        self.selected[idx] = state
+        self.update()
+
+    def boundingRect(self):
+        return self.bounds
+
+    def paint(self, painter, option, widget=None):
+        bones = self.bones[self.visible[self.bones].all(axis=1)]
+        if len(bones) > 0:
+            painter.setPen(self.bone_pen)
+            painter.drawLines([QLineF(x1, y1, x2, y2) for (x1, y1), (x2, y2) in self.coordinates[bones].tolist()])
+        for idx in np.flatnonzero(self.visible):
+            painter.setPen(self.selected_pen if self.selected[idx] else Qt.NoPen)
+            painter.setBrush(self.brushes[idx])
+            x, y = self.coordinates[idx]
+            painter.drawEllipse(QRectF(x - self.marker_offset, y - self.marker_offset, self.marker_size,
+                                       self.marker_size))
+
+    def marker_at(self, point, radius=None):
+        """
+        :param point: Position in item coordinates.
+        :param radius: Largest distance to a marker centre, defaults to the marker size.
+        :return: Index of the nearest visible marker within radius, or None.
+        """
+        radius = self.marker_size if radius is None else radius
+        return self.marker_index.nearest(point.x(), point.y(), radius)
+
+    def hoverMoveEvent(self, event):
+        idx = self.marker_at(event.pos())
+        tooltip = ''
+        if idx is not None:
+            x, y = self.coordinates[idx]
+            tooltip = f'{self.names[idx]:10} ({round(float(self.likelihood[idx]), 2)})\n{int(x):5},{int(y):5}'
+        if tooltip != self.toolTip():
+            self.setToolTip(tooltip)
+        super(SkeletonItem, self).hoverMoveEvent(event)
+
+
 class SkeletonController():
 
     def __init__(self, session_manager: SessionManager, threshold=0.6, marker_size=4):
@@ -32,6 +117,7 @@ class SkeletonController():
         self.marker_offset = marker_size // 2
         pen = QPen(Qt.white, 1, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
         self.selected_marker = None
+        self.marker_index = MarkerIndex()
         for lines in self.config.skeleton:
             self.lines.append(QGraphicsLineItem(0, 0, 1, 1))
             self.lines[-1].setPen(pen)
@@ -39,7 +125,12 @@ class SkeletonController():
             marker = Marker(idx, 0, 0, self.marker_size, self.marker_size, color)
             self.markers[name] = marker
 
+    def graphics_items(self):
+        return self.lines + list(self.markers.values())
+
     def update_skeleton(self, skeleton: Skeleton):
+        self.marker_index.set_points([[skeleton[part][0], skeleton[part][1]] for part in self.config.body_parts],
+                                     [skeleton[part] >= self.threshold for part in self.config.body_parts])
         for i, part in enumerate(self.config.body_parts):
             if skeleton[part] >= self.threshold:
                 self.markers[part].setVisible(True)
@@ -49,7 +140,6 @@ class SkeletonController():
                     f'{part:10} ({round(skeleton[part].likelihood, 2)})\n{int(skeleton[part][0]):5},{int(skeleton[part][1]):5}')
             else:
                 self.markers[part].setVisible(False)
-            self.markers[part].update()
 
         for line, end_points in zip(self.lines, self.config.skeleton):
             if all([self.markers[point].isVisible() for point in end_points]):
@@ -59,10 +149,47 @@ class SkeletonController():
                 line.setVisible(True)
             else:
                 line.setVisible(False)
-            line.update()
+
+    def marker_at(self, point, radius=None):
+        """
+        :param point: Position in scene coordinates.
+        :param radius: Largest distance to a marker centre, defaults to the marker size.
+        :return: Index of the nearest visible marker within radius, or None.
+        """
+        radius = self.marker_size if radius is None else radius
+        return self.marker_index.nearest(point.x(), point.y(), radius)
 
     def mark_selected(self, name, state):
         if state:
             self.markers[name].setPen(Qt.SolidLine)
         else:
             self.markers[name].setPen(Qt.NoPen)
+
+
+class BatchedSkeletonController():
+
+    def __init__(self, session_manager: SessionManager, threshold=0.6, marker_size=4):
+        """
+        Drop-in replacement of :py:class:`SkeletonController` that draws the skeleton as a single
+        :py:class:`SkeletonItem` instead of one graphics item per marker and bone.
+        """
+        self.threshold = threshold
+        self.config = session_manager.config
+        self.part_indices = {name: idx for idx, name in enumerate(self.config.body_parts)}
+        bones = [[self.part_indices[name] for name in end_points] for end_points in self.config.skeleton]
+        self.item = SkeletonItem(self.config.body_parts, self.config.colors, bones, marker_size)
+
+    def graphics_items(self):
+        return [self.item]
+
+    def update_skeleton(self, skeleton: Skeleton):
+        parts = [skeleton[part] for part in self.config.body_parts]
+        likelihood = np.array([part.likelihood for part in parts], dtype=np.float64)
+        coordinates = np.array([[part[0], part[1]] for part in parts], dtype=np.float64)
+        self.item.set_points(coordinates, likelihood, likelihood >= self.threshold)
+
+    def marker_at(self, point, radius=None):
+        return self.item.marker_at(self.item.mapFromScene(point), radius)
+
+    def mark_selected(self, name, state):
+        self.item.set_selected(self.part_indices[name], state)
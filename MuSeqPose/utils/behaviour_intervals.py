@@ -0,0 +1,90 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+
+class BehaviourIntervals:
+
+    def __init__(self):
+        """
+        Behaviours as sorted [start, end) runs of frames, one list of runs per behaviour. Marking a range, finding the
+        next occurrence and reading the behaviours of a frame are binary searches instead of per-frame scans.
+        """
+        self.starts = {}
+        self.ends = {}
+
+    @classmethod
+    def from_codes(cls, behaviour_codes, behaviour_sets):
+        """
+        :param behaviour_codes: Index into behaviour_sets of every frame.
+        :param behaviour_sets: Interned behaviour lists, see :py:class:`ColumnarDataStore`.
+        """
+        intervals = cls()
+        for behaviour in dict.fromkeys(name for behaviours in behaviour_sets for name in behaviours):
+            codes = [code for code, behaviours in enumerate(behaviour_sets) if behaviour in behaviours]
+            present = np.concatenate([[False], np.isin(behaviour_codes, codes), [False]])
+            edges = np.flatnonzero(present[1:] != present[:-1])
+            intervals.starts[behaviour] = edges[0::2].tolist()
+            intervals.ends[behaviour] = edges[1::2].tolist()
+        return intervals
+
+    def set_range(self, behaviour, start, end, present=True):
+        """
+        Marks or clears a behaviour over frames [start, end).
+        """
+        if start >= end:
+            return
+        starts = self.starts.setdefault(behaviour, [])
+        ends = self.ends.setdefault(behaviour, [])
+        # Runs overlapping or touching the range.
+        first, last = bisect_left(ends, start), bisect_right(starts, end)
+        if present:
+            if first < last:
+                start, end = min(start, starts[first]), max(end, ends[last - 1])
+            starts[first:last], ends[first:last] = [start], [end]
+        else:
+            kept_starts, kept_ends = [], []
+            if first < last and starts[first] < start:
+                kept_starts.append(starts[first])
+                kept_ends.append(start)
+            if first < last and ends[last - 1] > end:
+                kept_starts.append(end)
+                kept_ends.append(ends[last - 1])
+            starts[first:last], ends[first:last] = kept_starts, kept_ends
+
+    def set_behaviours(self, start, end, behaviours):
+        """
+        Sets the behaviours of frames [start, end) to exactly the given list.
+        """
+        for behaviour in dict.fromkeys(list(self.starts) + list(behaviours)):
+            self.set_range(behaviour, start, end, behaviour in behaviours)
+
+    def contains(self, behaviour, index):
+        if behaviour not in self.starts:
+            return False
+        i = bisect_right(self.starts[behaviour], index) - 1
+        return i >= 0 and index < self.ends[behaviour][i]
+
+    def get_behaviours(self, index) -> list:
+        return [behaviour for behaviour in self.starts if self.contains(behaviour, index)]
+
+    def next_occurrence(self, behaviour, index):
+        """
+        :return: First frame after index marked with the behaviour, or None.
+        """
+        if behaviour not in self.starts:
+            return None
+        starts, ends = self.starts[behaviour], self.ends[behaviour]
+        i = bisect_right(starts, index) - 1
+        if i >= 0 and index + 1 < ends[i]:
+            return index + 1
+        return starts[i + 1] if i + 1 < len(starts) else None
+
+    def previous_occurrence(self, behaviour, index):
+        """
+        :return: Last frame before index marked with the behaviour, or None.
+        """
+        if behaviour not in self.starts:
+            return None
+        i = bisect_right(self.starts[behaviour], index - 1) - 1
+        return min(self.ends[behaviour][i] - 1, index - 1) if i >= 0 else None
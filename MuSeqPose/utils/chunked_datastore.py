@@ -0,0 +1,457 @@
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import numpy as np
+
+from MuSeqPose.utils.columnar_datastore import ColumnarDataStore
+from cvkit import MAGIC_NUMBER
+from cvkit.pose_estimation import Part, Skeleton
+from cvkit.pose_estimation.data_readers import initialize_datastore_reader
+
+
+class ChunkedDataStore:
+
+    def __init__(self, body_parts, path, flavor, chunk_size=4096, max_cache_bytes=256 * 1024 * 1024):
+        """
+        Data store that keeps only parts of an annotation file in memory. Opening the file only records the byte offset
+        and frame number of every row, chunks of rows are parsed on first access and kept in an LRU bounded by
+        max_cache_bytes. Reading near the end of a chunk loads the next one in the background.
+
+        Edits go to an overlay that records the writes of every edited frame. On save they are replayed onto the parsed
+        chunks, so the parts and cells that were not edited are written back as read. Edits are not journaled in this
+        mode.
+
+        :param chunk_size: Number of rows parsed at once.
+        :param max_cache_bytes: Memory budget of the parsed chunks, the most recently used chunk is always kept.
+        """
+        self.body_parts = list(body_parts)
+        self.path = path
+        self.flavor = flavor
+        self.chunk_size = chunk_size
+        self.max_cache_bytes = max_cache_bytes
+        self.header_lines = 3 if flavor == 'deeplabcut' else 1
+        self.lock = Lock()
+        self.chunks = OrderedDict()
+        self.chunk_sizes = {}
+        self.pending = {}
+        # Bumped whenever the file is rewritten so chunks parsed from the old file are dropped.
+        self.generation = 0
+        # Writes of every edited frame, keyed by what they write so a later write replaces an earlier one. The writes of
+        # a frame are replaced rather than changed in place under the lock, so other threads can read them.
+        self.overlay = {}
+        # Called with the frame numbers of every write that changes parts.
+        self.write_listeners = []
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.index_rows()
+        template = self.parse_rows(0, 0)
+        self.FLAVOR = template.FLAVOR
+        self.DIMENSIONS = template.DIMENSIONS
+        # Deeplabcut parts are 2D even though the store reports three dimensions.
+        self.part_dimensions = 2 if self.FLAVOR == 'deeplabcut' else self.DIMENSIONS
+        self.padding_value = 0.0 if self.FLAVOR == 'deeplabcut' else MAGIC_NUMBER
+        self.SEP = template.SEP
+        self.BEHAVIOUR_SEP = template.BEHAVIOUR_SEP
+        self.MAGIC_NUMBER = template.MAGIC_NUMBER
+        self.scorer = getattr(template, 'scorer', None)
+
+    def add_write_listener(self, callback):
+        self.write_listeners.append(callback)
+
+    def notify_write(self, indices):
+        for callback in self.write_listeners:
+            callback(indices)
+
+    def index_rows(self):
+        """
+        Records the byte offset, length and frame number of every data row without parsing it.
+        """
+        self.header = b''
+        offsets, lengths, frames = [], [], []
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path, 'rb') as file:
+                self.header = b''.join(file.readline() for _ in range(self.header_lines))
+                offset = len(self.header)
+                for line in file:
+                    if line.strip():
+                        offsets.append(offset)
+                        lengths.append(len(line))
+                        # Deeplabcut rows start with the frame number, other flavors are indexed by position.
+                        frames.append(int(line.split(b',', 1)[0]) if self.flavor == 'deeplabcut' else len(frames))
+                    offset += len(line)
+        self.row_offsets = np.array(offsets, dtype=np.int64)
+        self.row_lengths = np.array(lengths, dtype=np.int64)
+        self.row_frames = np.array(frames, dtype=np.int64)
+        if len(self.row_frames) and np.any(np.diff(self.row_frames) < 0):
+            order = np.argsort(self.row_frames, kind='stable')
+            self.row_offsets, self.row_lengths, self.row_frames = self.row_offsets[order], self.row_lengths[order], \
+                self.row_frames[order]
+
+    def get_number_of_chunks(self):
+        return (len(self.row_frames) + self.chunk_size - 1) // self.chunk_size
+
+    def read_rows(self, start, end):
+        if start >= end:
+            return b''
+        with open(self.path, 'rb') as file:
+            offsets, lengths = self.row_offsets[start:end], self.row_lengths[start:end]
+            if np.all(offsets[1:] == offsets[:-1] + lengths[:-1]):
+                file.seek(offsets[0])
+                lines = [file.read(int(offsets[-1] + lengths[-1] - offsets[0]))]
+            else:
+                lines = []
+                for offset, length in zip(offsets, lengths):
+                    file.seek(offset)
+                    lines.append(file.read(int(length)))
+        return b''.join(line if line.endswith(b'\n') else line + b'\n' for line in lines)
+
+    def parse_rows(self, start, end):
+        """
+        Parses rows [start, end) with the reader of the file flavor.
+
+        :return: Data store holding the rows, indexed by frame number.
+        """
+        if not self.header:
+            data_store = initialize_datastore_reader(self.body_parts, None, self.flavor)
+            data_store.path = self.path
+            return data_store
+        file, temp_path = tempfile.mkstemp(suffix=os.path.splitext(self.path)[1])
+        try:
+            with os.fdopen(file, 'wb') as temp_file:
+                temp_file.write(self.header)
+                temp_file.write(self.read_rows(start, end))
+            data_store = initialize_datastore_reader(self.body_parts, temp_path, self.flavor)
+        finally:
+            os.remove(temp_path)
+        data_store.path = self.path
+        if self.flavor != 'deeplabcut':
+            data_store.data.index = self.row_frames[start:end]
+        return data_store
+
+    def load_chunk(self, chunk, generation):
+        start = chunk * self.chunk_size
+        end = min(start + self.chunk_size, len(self.row_frames))
+        data_store = self.parse_rows(start, end)
+        # Frames are stored relative to the first frame of the chunk so the arrays only span the chunk.
+        data_store.data.index = np.asarray(data_store.data.index, dtype=np.int64) - self.row_frames[start]
+        columnar = ColumnarDataStore(data_store)
+        data_store.data = None
+        size = columnar.coordinates.nbytes + columnar.likelihood.nbytes + columnar.row_mask.nbytes + \
+            columnar.behaviour_codes.nbytes
+        with self.lock:
+            self.pending.pop(chunk, None)
+            if generation == self.generation:
+                self.chunks[chunk] = columnar
+                self.chunk_sizes[chunk] = size
+                self.evict()
+        return columnar
+
+    def evict(self):
+        while len(self.chunks) > 1 and sum(self.chunk_sizes.values()) > self.max_cache_bytes:
+            chunk, _ = self.chunks.popitem(last=False)
+            del self.chunk_sizes[chunk]
+
+    def get_chunk(self, chunk) -> ColumnarDataStore:
+        with self.lock:
+            if chunk in self.chunks:
+                self.chunks.move_to_end(chunk)
+                return self.chunks[chunk]
+            future = self.pending.get(chunk, None)
+            generation = self.generation
+        if future is not None:
+            return future.result()
+        return self.load_chunk(chunk, generation)
+
+    def prefetch_chunk(self, chunk):
+        if not 0 <= chunk < self.get_number_of_chunks():
+            return
+        with self.lock:
+            if chunk in self.chunks or chunk in self.pending:
+                return
+            self.pending[chunk] = self.executor.submit(self.load_chunk, chunk, self.generation)
+
+    def prefetch(self, start, end):
+        """
+        Loads the chunks covering frames [start, end) in the background, for processors that know the range they
+        are about to read.
+        """
+        first, last = np.searchsorted(self.row_frames, [start, end])
+        for chunk in range(first // self.chunk_size, (last + self.chunk_size - 1) // self.chunk_size):
+            self.prefetch_chunk(chunk)
+
+    def locate(self, index):
+        """
+        :return: Chunk and chunk relative frame of a frame present in the file, or None.
+        """
+        row = int(np.searchsorted(self.row_frames, index))
+        if row == len(self.row_frames) or self.row_frames[row] != index:
+            return None
+        chunk = row // self.chunk_size
+        # Keep the chunk the playhead is heading into ready.
+        position = row % self.chunk_size
+        if position >= self.chunk_size // 2:
+            self.prefetch_chunk(chunk + 1)
+        elif position < self.chunk_size // 4:
+            self.prefetch_chunk(chunk - 1)
+        return chunk, index - self.row_frames[chunk * self.chunk_size]
+
+    def exists(self, index):
+        return index in self.overlay or self.locate(index) is not None
+
+    def get_edited_frames(self):
+        with self.lock:
+            return list(self.overlay)
+
+    def __len__(self):
+        return len(self.row_frames) + len([index for index in self.get_edited_frames() if self.locate(index) is None])
+
+    def build_empty_skeleton(self):
+        return Skeleton(self.body_parts,
+                        part_map={name: [MAGIC_NUMBER] * self.DIMENSIONS for name in self.body_parts},
+                        likelihood_map={name: 0.0 for name in self.body_parts}, behaviour='', dims=self.DIMENSIONS)
+
+    def copy_skeleton(self, skeleton):
+        return Skeleton(self.body_parts, part_map={name: np.array(skeleton[name]) for name in self.body_parts},
+                        likelihood_map={name: skeleton[name].likelihood for name in self.body_parts},
+                        behaviour=list(skeleton.behaviour), dims=skeleton.dims)
+
+    def record_edit(self, index, key, method, *args, replace=False):
+        """
+        Records a write to be replayed on the data store of the file as method(index, *args).
+
+        :param replace: Drop the earlier writes to the frame.
+        """
+        with self.lock:
+            edits = {} if replace else dict(self.overlay.get(index, {}))
+            edits.pop(key, None)
+            edits[key] = (method, args)
+            self.overlay[index] = edits
+
+    def apply_edits(self, data_store, index):
+        for method, args in self.overlay[index].values():
+            getattr(data_store, method)(index, *args)
+
+    def edit_skeleton(self, skeleton, edits):
+        """
+        Applies the recorded writes of a frame to a skeleton read from its chunk.
+        """
+        for method, args in edits.values():
+            if method == 'set_skeleton':
+                skeleton = self.copy_skeleton(args[0])
+            elif method == 'set_part':
+                part = args[0]
+                skeleton[part.name] = Part(np.array(part), part.name, part.likelihood)
+            elif method == 'delete_part':
+                name = args[0]
+                # Deeplabcut files only drop the likelihood, the other flavors clear the coordinates.
+                coordinates = np.array(skeleton[name]) if self.FLAVOR == 'deeplabcut' else \
+                    [MAGIC_NUMBER] * self.DIMENSIONS
+                skeleton[name] = Part(coordinates, name, 0.0)
+            elif method == 'set_behaviour':
+                skeleton.behaviour = list(args[0])
+        return skeleton
+
+    def get_skeleton(self, index) -> Skeleton:
+        location = self.locate(index)
+        if location is None:
+            skeleton = self.build_empty_skeleton()
+        else:
+            chunk, local_index = location
+            skeleton = self.get_chunk(chunk).get_skeleton(local_index)
+        edits = self.overlay.get(index, None)
+        return self.edit_skeleton(skeleton, edits) if edits is not None else skeleton
+
+    def get_part(self, index, name) -> Part:
+        if index in self.overlay:
+            part = self.get_skeleton(index)[name]
+            return Part(np.array(part), name, part.likelihood)
+        location = self.locate(index)
+        if location is None:
+            return Part([MAGIC_NUMBER] * self.DIMENSIONS, name, 0.0)
+        chunk, local_index = location
+        return self.get_chunk(chunk).get_part(local_index, name)
+
+    def get_behaviour(self, index) -> list:
+        if index in self.overlay:
+            return list(self.get_skeleton(index).behaviour)
+        location = self.locate(index)
+        if location is None:
+            return []
+        chunk, local_index = location
+        return self.get_chunk(chunk).get_behaviour(local_index)
+
+    def find_behaviour(self, index, behaviour, forward=True):
+        """
+        :return: Nearest frame after (or before) index marked with the behaviour, or None. Chunks are searched outwards
+            from index, each with its own behaviour intervals.
+        """
+        edited = [frame for frame in self.get_edited_frames() if (frame > index if forward else frame < index) and
+                  behaviour in self.get_behaviour(frame)]
+        best = (min(edited) if forward else max(edited)) if edited else None
+        row = int(np.searchsorted(self.row_frames, index, side='right' if forward else 'left'))
+        chunk = row // self.chunk_size if forward else (row - 1) // self.chunk_size
+        while 0 <= chunk < self.get_number_of_chunks():
+            first_frame = int(self.row_frames[chunk * self.chunk_size])
+            last_frame = int(self.row_frames[min((chunk + 1) * self.chunk_size, len(self.row_frames)) - 1])
+            if best is not None and (first_frame > best if forward else last_frame < best):
+                break
+            columnar = self.get_chunk(chunk)
+            local_index = index - first_frame
+            while True:
+                local_index = columnar.find_behaviour(local_index, behaviour, forward)
+                # Frames in the overlay were edited, their chunk copy is stale.
+                if local_index is None or local_index + first_frame not in self.overlay:
+                    break
+            if local_index is not None:
+                frame = local_index + first_frame
+                if best is None or (frame < best if forward else frame > best):
+                    best = frame
+                return best
+            chunk += 1 if forward else -1
+        return best
+
+    def get_slice(self, slice_indices, names=None):
+        """
+        :param slice_indices: Starting and ending (non-inclusive) frame of the slice.
+        :param names: Parts to include, defaults to all parts.
+        :return: Coordinates of shape (frames, parts, 3) and likelihoods of shape (frames, parts).
+        """
+        names = self.body_parts if names is None else names
+        start, end = slice_indices
+        coordinates = np.full((end - start, len(names), 3), MAGIC_NUMBER, dtype=np.float32)
+        likelihood = np.zeros((end - start, len(names)), dtype=np.float32)
+        if len(self.row_frames) and start < end:
+            # Chunk c covers the frames from its first row up to the first row of the next chunk.
+            first_rows = self.row_frames[::self.chunk_size]
+            first_chunk = max(0, int(np.searchsorted(first_rows, start, side='right')) - 1)
+            last_chunk = max(0, int(np.searchsorted(first_rows, end - 1, side='right')) - 1)
+            for chunk in range(first_chunk, last_chunk + 1):
+                first_frame = int(first_rows[chunk])
+                low = max(start, first_frame)
+                high = min(end, int(first_rows[chunk + 1])) if chunk + 1 < len(first_rows) else end
+                if low >= high:
+                    continue
+                chunk_coordinates, chunk_likelihood = self.get_chunk(chunk).get_slice(
+                    (low - first_frame, high - first_frame), names)
+                coordinates[low - start:high - start] = chunk_coordinates
+                likelihood[low - start:high - start] = chunk_likelihood
+        # Edited frames are read whole, their chunk copy is stale.
+        for index in self.get_edited_frames():
+            if start <= index < end:
+                skeleton = self.get_skeleton(index)
+                for idx, name in enumerate(names):
+                    part = skeleton[name]
+                    coordinates[index - start, idx, :self.part_dimensions] = np.asarray(part)[:self.part_dimensions]
+                    coordinates[index - start, idx, self.part_dimensions:] = self.padding_value
+                    likelihood[index - start, idx] = part.likelihood
+        return coordinates, likelihood
+
+    def row_iterator(self):
+        for index in sorted(set(self.row_frames.tolist()) | set(self.get_edited_frames())):
+            yield index, self.get_skeleton(index)
+
+    def part_iterator(self, part):
+        for index, skeleton in self.row_iterator():
+            yield index, skeleton[part]
+
+    @property
+    def data(self):
+        """
+        Whole file with the overlay applied. This parses every row, edits to the returned frame are not kept.
+        """
+        data_store = self.parse_rows(0, len(self.row_frames))
+        for index in sorted(self.get_edited_frames()):
+            self.apply_edits(data_store, index)
+        return data_store.data
+
+    def set_part(self, index, part: Part) -> None:
+        self.record_edit(index, ('part', part.name), 'set_part', Part(np.array(part), part.name, part.likelihood))
+        self.notify_write([index])
+
+    def set_part_block(self, indices, name, coordinates, likelihood) -> None:
+        indices = [int(index) for index in indices]
+        for index, point in zip(indices, np.asarray(coordinates)):
+            self.record_edit(index, ('part', name), 'set_part', Part(np.array(point), name, likelihood))
+        self.notify_write(indices)
+
+    def set_skeleton(self, index, skeleton, force_insert=False) -> None:
+        # Same rule as DataStoreInterface.set_skeleton, new rows are only inserted when they hold valid parts.
+        if force_insert or self.exists(index) or any([skeleton[name] > 0 for name in self.body_parts]):
+            # The whole frame is replaced, earlier writes to it are moot.
+            self.record_edit(index, 'skeleton', 'set_skeleton', self.copy_skeleton(skeleton), True, replace=True)
+            self.notify_write([index])
+
+    def set_behaviour(self, index, behaviour: list) -> None:
+        self.record_edit(index, 'behaviour', 'set_behaviour', list(behaviour))
+
+    def set_behaviour_range(self, start, end, behaviour: list) -> None:
+        # Edits are recorded per frame, so a range is still written frame by frame.
+        for index in range(start, end):
+            self.set_behaviour(index, behaviour)
+
+    def delete_part(self, index, name, force_remove=False):
+        if not force_remove and not self.exists(index):
+            return
+        self.record_edit(index, ('part', name), 'delete_part', name, True)
+        self.notify_write([index])
+
+    def delete_skeleton(self, index):
+        if self.exists(index):
+            for name in self.body_parts:
+                self.delete_part(index, name, True)
+
+    def save_file(self, path: str = None) -> None:
+        """
+        Merges the overlay into the annotation file one chunk at a time, so the whole file is never held in memory.
+
+        :param path: Path of the file. If None, the annotation file is overwritten and the overlay cleared.
+        """
+        target = self.path if path is None else path
+        temp_path = f'{target}.merging{os.path.splitext(target)[1]}'
+        chunk_path = f'{target}.chunk{os.path.splitext(target)[1]}'
+        overlay_frames = np.array(sorted(self.get_edited_frames()), dtype=np.int64)
+        number_of_chunks = max(1, self.get_number_of_chunks())
+        try:
+            with open(temp_path, 'wb') as output:
+                for chunk in range(number_of_chunks):
+                    start = chunk * self.chunk_size
+                    end = min(start + self.chunk_size, len(self.row_frames))
+                    # Each chunk takes the edited frames up to the first frame of the next one.
+                    low = self.row_frames[start] if chunk > 0 else np.iinfo(np.int64).min
+                    high = self.row_frames[end] if chunk + 1 < number_of_chunks else np.iinfo(np.int64).max
+                    data_store = self.parse_rows(start, end)
+                    for index in overlay_frames[(overlay_frames >= low) & (overlay_frames < high)]:
+                        self.apply_edits(data_store, int(index))
+                    data_store.save_file(chunk_path)
+                    with open(chunk_path, 'rb') as chunk_file:
+                        if chunk > 0:
+                            for _ in range(self.header_lines):
+                                chunk_file.readline()
+                        shutil.copyfileobj(chunk_file, output)
+            os.replace(temp_path, target)
+        finally:
+            for leftover in (chunk_path, temp_path):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        if target == self.path:
+            with self.lock:
+                self.generation += 1
+                self.chunks.clear()
+                self.chunk_sizes.clear()
+                self.pending.clear()
+                self.overlay.clear()
+            self.index_rows()
+
+    def has_pending_edits(self):
+        return len(self.overlay) > 0
+
+    def close(self, discard=False):
+        """
+        :param discard: Drop the edits that were not saved instead of merging them into the annotation file.
+        """
+        if not discard and self.has_pending_edits():
+            self.save_file()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,300 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from MuSeqPose.utils.behaviour_intervals import BehaviourIntervals
+from MuSeqPose.utils.datastore_cache import save_datastore_cache
+from MuSeqPose.utils.datastore_utils import set_behaviour_block, set_part_block
+from cvkit import MAGIC_NUMBER
+from cvkit.pose_estimation import Part, Skeleton
+from cvkit.pose_estimation.utils import convert_to_numpy
+
+
+class ColumnarDataStore:
+
+    def __init__(self, data_store, cache=None):
+        """
+        Array-backed mirror of a data store. Coordinates live in one contiguous (frames, parts, 3) float32 array and
+        behaviours in a table of interned behaviour sets, mirrored as :py:class:`BehaviourIntervals` for per-frame
+        reads and range queries, so reads never touch the data frame. Writes update
+        the arrays and are forwarded to the wrapped store, which stays the source of truth for saving.
+
+        :param data_store: Data store to wrap, all other attributes are forwarded to it.
+        :param cache: Arrays from :py:func:`load_datastore_cache`, used instead of reading the wrapped store.
+        """
+        self.data_store = data_store
+        self.body_parts = list(data_store.body_parts)
+        self.part_indices = {name: idx for idx, name in enumerate(self.body_parts)}
+        # Deeplabcut parts are 2D even though the store reports three dimensions, and its skeletons pad z with 0.
+        self.part_dimensions = 2 if data_store.FLAVOR == 'deeplabcut' else data_store.DIMENSIONS
+        self.padding_value = 0.0 if data_store.FLAVOR == 'deeplabcut' else MAGIC_NUMBER
+        # Flattened and CVKit3D files have no likelihood column, a part is valid when any coordinate is set.
+        self.stores_likelihood = data_store.FLAVOR not in ('flattened', 'CVKit3D')
+        self.coordinates = np.full((0, len(self.body_parts), 3), MAGIC_NUMBER, dtype=np.float32)
+        self.likelihood = np.zeros((0, len(self.body_parts)), dtype=np.float32)
+        self.row_mask = np.zeros((0,), dtype=bool)
+        # Each frame points into behaviour_sets, code 0 is the empty set.
+        self.behaviour_codes = np.zeros((0,), dtype=np.int32)
+        self.behaviour_sets = [()]
+        self.behaviour_set_codes = {(): 0}
+        self.behaviour_intervals = BehaviourIntervals()
+        # Called with the frame numbers of every write that changes parts.
+        self.write_listeners = []
+        if cache is not None:
+            self.load_cache(cache)
+        else:
+            self.load()
+        self.behaviour_intervals = BehaviourIntervals.from_codes(self.behaviour_codes, self.behaviour_sets)
+
+    def __getattr__(self, name):
+        return getattr(self.data_store, name)
+
+    def __len__(self):
+        return int(self.row_mask.sum())
+
+    def ensure_capacity(self, index):
+        size = len(self.row_mask)
+        if index < size:
+            return
+        new_size = max(index + 1, 2 * size)
+        coordinates = np.full((new_size, len(self.body_parts), 3), MAGIC_NUMBER, dtype=np.float32)
+        coordinates[:size] = self.coordinates
+        likelihood = np.zeros((new_size, len(self.body_parts)), dtype=np.float32)
+        likelihood[:size] = self.likelihood
+        self.coordinates, self.likelihood = coordinates, likelihood
+        self.row_mask = np.concatenate([self.row_mask, np.zeros((new_size - size,), dtype=bool)])
+        self.behaviour_codes = np.concatenate([self.behaviour_codes, np.zeros((new_size - size,), dtype=np.int32)])
+
+    def get_behaviour_code(self, behaviour):
+        behaviour = tuple(behaviour)
+        if behaviour not in self.behaviour_set_codes:
+            self.behaviour_set_codes[behaviour] = len(self.behaviour_sets)
+            self.behaviour_sets.append(behaviour)
+        return self.behaviour_set_codes[behaviour]
+
+    def load(self):
+        data = self.data_store.data
+        if data is None or len(data) == 0:
+            return
+        indices = np.asarray(data.index, dtype=np.int64)
+        self.ensure_capacity(int(indices.max()))
+        self.row_mask[indices] = True
+        flavor = self.data_store.FLAVOR
+        if flavor == 'deeplabcut':
+            scorer = self.data_store.scorer
+            for idx, name in enumerate(self.body_parts):
+                self.coordinates[indices, idx, 0] = data[(scorer, name, 'x')].to_numpy(dtype=np.float32)
+                self.coordinates[indices, idx, 1] = data[(scorer, name, 'y')].to_numpy(dtype=np.float32)
+                self.coordinates[indices, idx, 2] = 0.0
+                self.likelihood[indices, idx] = data[(scorer, name, 'likelihood')].to_numpy(dtype=np.float32)
+            behaviours = data[(scorer, 'behaviour', 'name')]
+        elif flavor in ('flattened', 'CVKit3D'):
+            for idx, name in enumerate(self.body_parts):
+                if flavor == 'flattened':
+                    points = data[[f'{name}_{i}' for i in range(1, self.part_dimensions + 1)]].to_numpy(
+                        dtype=np.float32, na_value=np.nan)
+                    points[np.isnan(points).any(axis=1)] = MAGIC_NUMBER
+                else:
+                    points = np.array(
+                        [convert_to_numpy(value) if not pd.isna(value) else [MAGIC_NUMBER] * self.part_dimensions
+                         for value in data[name]], dtype=np.float32).reshape(-1, self.part_dimensions)
+                self.coordinates[indices, idx, :self.part_dimensions] = points
+                self.likelihood[indices, idx] = np.any(points != MAGIC_NUMBER, axis=1)
+            behaviours = data['behaviour']
+        else:
+            for index in indices:
+                self.mirror_skeleton(index, self.data_store.get_skeleton(index))
+            return
+        for index, behaviour in zip(indices, behaviours):
+            if not pd.isna(behaviour) and behaviour != '':
+                self.behaviour_codes[index] = self.get_behaviour_code(behaviour.split(self.data_store.BEHAVIOUR_SEP))
+
+    def add_write_listener(self, callback):
+        self.write_listeners.append(callback)
+
+    def notify_write(self, indices):
+        for callback in self.write_listeners:
+            callback(indices)
+
+    def load_cache(self, cache):
+        self.coordinates = cache['coordinates']
+        self.likelihood = cache['likelihood']
+        self.row_mask = cache['row_mask']
+        self.behaviour_codes = cache['behaviour_codes']
+        self.behaviour_sets = [tuple(behaviour.split(self.data_store.BEHAVIOUR_SEP)) if behaviour != '' else ()
+                               for behaviour in cache['behaviour_sets'].tolist()]
+        self.behaviour_set_codes = {behaviour: code for code, behaviour in enumerate(self.behaviour_sets)}
+
+    def close(self, discard=False):
+        """
+        Closes the wrapped store. Journaled stores without pending edits match their annotation file, so their arrays
+        are written to the binary cache for the next session.
+
+        :param discard: Drop the edits that were not saved, see :py:meth:`JournaledDataStore.close`.
+        """
+        if hasattr(self.data_store, 'close'):
+            self.data_store.close(discard)
+        # Discarded edits are still in the arrays.
+        if not discard and hasattr(self.data_store, 'has_pending_edits') and not self.data_store.has_pending_edits() \
+                and os.path.exists(self.data_store.path):
+            save_datastore_cache(self, os.stat(self.data_store.path), background=False)
+
+    def build_empty_skeleton(self):
+        # Built here so reads of missing frames do not wait for a deferred store to load.
+        dimensions = self.data_store.DIMENSIONS
+        return Skeleton(self.body_parts, part_map={name: [MAGIC_NUMBER] * dimensions for name in self.body_parts},
+                        likelihood_map={name: 0.0 for name in self.body_parts}, behaviour='', dims=dimensions)
+
+    def mirror_part(self, index, part):
+        self.ensure_capacity(index)
+        self.row_mask[index] = True
+        idx = self.part_indices[part.name]
+        self.coordinates[index, idx, :len(part)] = part
+        self.coordinates[index, idx, len(part):] = self.padding_value
+        if self.stores_likelihood:
+            self.likelihood[index, idx] = part.likelihood
+        else:
+            self.likelihood[index, idx] = np.any(np.asarray(part) != MAGIC_NUMBER)
+
+    def mirror_skeleton(self, index, skeleton):
+        for name in self.body_parts:
+            self.mirror_part(index, skeleton[name])
+        self.behaviour_codes[index] = self.get_behaviour_code(skeleton.behaviour)
+        self.behaviour_intervals.set_behaviours(index, index + 1, skeleton.behaviour)
+
+    def get_skeleton(self, index) -> Skeleton:
+        if not 0 <= index < len(self.row_mask) or not self.row_mask[index]:
+            return self.build_empty_skeleton()
+        # One copy per frame, the parts are views into it so edits never leak into the store without a set call.
+        coordinates = self.coordinates[index].copy()
+        likelihood = self.likelihood[index].tolist()
+        return Skeleton(self.body_parts, part_map={name: coordinates[idx] for idx, name in enumerate(self.body_parts)},
+                        likelihood_map=dict(zip(self.body_parts, likelihood)),
+                        behaviour=self.behaviour_intervals.get_behaviours(index))
+
+    def get_part(self, index, name) -> Part:
+        if not 0 <= index < len(self.row_mask) or not self.row_mask[index]:
+            return Part([MAGIC_NUMBER] * self.data_store.DIMENSIONS, name, 0.0)
+        idx = self.part_indices[name]
+        return Part(self.coordinates[index, idx, :self.part_dimensions].copy(), name,
+                    float(self.likelihood[index, idx]))
+
+    def get_behaviour(self, index) -> list:
+        return self.behaviour_intervals.get_behaviours(index)
+
+    def find_behaviour(self, index, behaviour, forward=True):
+        """
+        :return: Nearest frame after (or before) index marked with the behaviour, or None.
+        """
+        if forward:
+            return self.behaviour_intervals.next_occurrence(behaviour, index)
+        return self.behaviour_intervals.previous_occurrence(behaviour, index)
+
+    def get_slice(self, slice_indices, names=None):
+        """
+        :param slice_indices: Starting and ending (non-inclusive) frame of the slice.
+        :param names: Parts to include, defaults to all parts.
+        :return: Coordinates of shape (frames, parts, 3) and likelihoods of shape (frames, parts).
+        """
+        start, end = slice_indices
+        columns = list(range(len(self.body_parts))) if names is None else [self.part_indices[name] for name in names]
+        coordinates = np.full((end - start, len(columns), 3), MAGIC_NUMBER, dtype=np.float32)
+        likelihood = np.zeros((end - start, len(columns)), dtype=np.float32)
+        # Frames past the arrays are missing, reads never grow the arrays so they are safe from other threads.
+        available = min(end, len(self.row_mask)) - start
+        if available > 0:
+            coordinates[:available] = self.coordinates[start:start + available][:, columns]
+            likelihood[:available] = self.likelihood[start:start + available][:, columns]
+        return coordinates, likelihood
+
+    def set_slice(self, slice_indices, coordinates, likelihood, names=None):
+        """
+        Writes a block of frames for several parts, the inverse of :py:meth:`get_slice`.
+        """
+        names = self.body_parts if names is None else names
+        indices = np.arange(*slice_indices)
+        likelihood = np.asarray(likelihood)
+        for idx, name in enumerate(names):
+            self.set_part_block(indices, name, coordinates[:, idx, :self.part_dimensions],
+                                likelihood[:, idx] if likelihood.ndim else likelihood)
+
+    def set_part_block(self, indices, name, coordinates, likelihood) -> None:
+        indices = np.asarray(indices)
+        if len(indices) == 0:
+            return
+        coordinates = np.asarray(coordinates, dtype=np.float32)
+        self.ensure_capacity(int(indices.max()))
+        idx = self.part_indices[name]
+        self.row_mask[indices] = True
+        self.coordinates[indices, idx, :coordinates.shape[1]] = coordinates
+        if self.stores_likelihood:
+            self.likelihood[indices, idx] = likelihood
+        else:
+            self.likelihood[indices, idx] = np.any(coordinates != MAGIC_NUMBER, axis=1)
+        if hasattr(self.data_store, 'set_part_block'):
+            self.data_store.set_part_block(indices, name, coordinates, likelihood)
+        else:
+            set_part_block(self.data_store, indices, name, coordinates, likelihood)
+        self.notify_write(indices)
+
+    def set_part(self, index, part: Part) -> None:
+        self.mirror_part(index, part)
+        self.data_store.set_part(index, part)
+        self.notify_write([index])
+
+    def set_skeleton(self, index, skeleton, force_insert=False) -> None:
+        self.data_store.set_skeleton(index, skeleton, force_insert)
+        # Same rule as DataStoreInterface.set_skeleton, new rows are only inserted when they hold valid parts.
+        exists = 0 <= index < len(self.row_mask) and self.row_mask[index]
+        if force_insert or exists or any([skeleton[name] > 0 for name in self.body_parts]):
+            self.mirror_skeleton(index, skeleton)
+            self.notify_write([index])
+
+    def set_behaviour(self, index, behaviour: list) -> None:
+        self.ensure_capacity(index)
+        self.row_mask[index] = True
+        self.behaviour_codes[index] = self.get_behaviour_code(behaviour)
+        self.behaviour_intervals.set_behaviours(index, index + 1, behaviour)
+        self.data_store.set_behaviour(index, behaviour)
+
+    def set_behaviour_range(self, start, end, behaviour: list) -> None:
+        """
+        Sets the behaviours of frames [start, end) in one operation.
+        """
+        if start >= end:
+            return
+        self.ensure_capacity(end - 1)
+        self.row_mask[start:end] = True
+        self.behaviour_codes[start:end] = self.get_behaviour_code(behaviour)
+        self.behaviour_intervals.set_behaviours(start, end, behaviour)
+        if hasattr(self.data_store, 'set_behaviour_range'):
+            self.data_store.set_behaviour_range(start, end, behaviour)
+        else:
+            set_behaviour_block(self.data_store, range(start, end), behaviour)
+
+    def get_deleted_part(self, index, name) -> Part:
+        """
+        Part left by delete_part, built from the arrays so deletes do not wait for a deferred store to load.
+        """
+        flavor = self.data_store.FLAVOR
+        if flavor == 'deeplabcut':
+            # Deeplabcut stores only zero the likelihood, a row they insert has no coordinates.
+            coordinates = self.coordinates[index, self.part_indices[name], :2] if self.row_mask[index] else [np.nan] * 2
+            return Part(coordinates, name, 0.0)
+        if flavor in ('flattened', 'CVKit3D'):
+            return Part([MAGIC_NUMBER] * self.part_dimensions, name, 0.0)
+        return self.data_store.get_part(index, name)
+
+    def delete_part(self, index, name, force_remove=False):
+        self.data_store.delete_part(index, name, force_remove)
+        if 0 <= index < len(self.row_mask) and (force_remove or self.row_mask[index]):
+            self.mirror_part(index, self.get_deleted_part(index, name))
+            self.notify_write([index])
+
+    def delete_skeleton(self, index):
+        self.data_store.delete_skeleton(index)
+        if 0 <= index < len(self.row_mask) and self.row_mask[index]:
+            for name in self.body_parts:
+                self.mirror_part(index, self.get_deleted_part(index, name))
+            self.notify_write([index])
@@ -0,0 +1,173 @@
+import hashlib
+import os
+from threading import Lock, Thread
+
+import numpy as np
+
+from MuSeqPose.utils.datastore_utils import set_behaviour_block, set_part_block
+from cvkit.pose_estimation import Part, Skeleton
+
+CACHE_VERSION = 1
+cache_write_lock = Lock()
+
+
+def get_cache_path(path, body_parts):
+    # Stores of different columns of the same file keep separate caches.
+    digest = hashlib.sha1('\n'.join(body_parts).encode()).hexdigest()[:8]
+    return f'{os.path.splitext(path)[0]}_cache_{digest}.npz'
+
+
+def load_datastore_cache(path, body_parts, flavor):
+    """
+    Loads the binary cache of an annotation file. The cache is keyed on the path, size and modification time of the
+    annotation file.
+
+    :return: Dictionary of cached arrays or None if the cache is missing or out of date.
+    """
+    cache_path = get_cache_path(path, body_parts)
+    if not os.path.exists(cache_path) or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    try:
+        with np.load(cache_path) as cache:
+            if int(cache['version']) != CACHE_VERSION or str(cache['source_path']) != os.path.abspath(path) \
+                    or int(cache['size']) != stat.st_size or int(cache['mtime_ns']) != stat.st_mtime_ns \
+                    or str(cache['flavor']) != flavor or cache['body_parts'].tolist() != list(body_parts):
+                return None
+            return {key: cache[key] for key in cache.files}
+    except Exception as ex:
+        print(f'Could not load cache {cache_path}: {ex}')
+        return None
+
+
+def save_datastore_cache(data_store, stat, background=True):
+    """
+    Writes the arrays of a :py:class:`ColumnarDataStore` to the binary cache of its annotation file.
+
+    :param data_store: Columnar data store holding the same data as the annotation file.
+    :param stat: ``os.stat`` result of the annotation file taken before it was parsed.
+    :param background: Write the cache on a daemon thread, the arrays are copied before returning.
+    """
+    path = data_store.path
+    arrays = dict(version=CACHE_VERSION, source_path=os.path.abspath(path), size=stat.st_size,
+                  mtime_ns=stat.st_mtime_ns, flavor=data_store.FLAVOR, dimensions=data_store.DIMENSIONS,
+                  body_parts=np.array(data_store.body_parts), coordinates=data_store.coordinates.copy(),
+                  likelihood=data_store.likelihood.copy(), row_mask=data_store.row_mask.copy(),
+                  behaviour_codes=data_store.behaviour_codes.copy(),
+                  behaviour_sets=np.array([data_store.BEHAVIOUR_SEP.join(behaviour)
+                                           for behaviour in data_store.behaviour_sets], dtype=str))
+    if background:
+        Thread(target=write_cache, args=(get_cache_path(path, data_store.body_parts), arrays), daemon=True).start()
+    else:
+        write_cache(get_cache_path(path, data_store.body_parts), arrays)
+
+
+def write_cache(cache_path, arrays):
+    temp_path = f'{cache_path}.part'
+    # A background write from opening the file can still run when the store is closed.
+    with cache_write_lock:
+        try:
+            with open(temp_path, 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(temp_path, cache_path)
+        except Exception as ex:
+            print(f'Could not write cache {cache_path}: {ex}')
+
+
+class DeferredDataStore:
+
+    def __init__(self, factory, body_parts, path, flavor, dimensions, behaviour_sep):
+        """
+        Builds a data store on a background thread. The metadata passed in is available right away. Writes made
+        before the store is loaded are queued and applied once it is, any other attribute access waits for the store
+        to finish loading.
+
+        :param factory: Callable returning the data store.
+        """
+        self.body_parts = body_parts
+        self.path = path
+        self.FLAVOR = flavor
+        self.DIMENSIONS = dimensions
+        self.BEHAVIOUR_SEP = behaviour_sep
+        self.data_store = None
+        self.pending_writes = []
+        self.lock = Lock()
+        self.thread = Thread(target=self.load, args=(factory,), daemon=True)
+        self.thread.start()
+
+    def load(self, factory):
+        data_store = factory()
+        with self.lock:
+            for method, args in self.pending_writes:
+                self.apply(data_store, method, args)
+            self.pending_writes.clear()
+            self.data_store = data_store
+
+    def __getattr__(self, name):
+        if name in ('thread', 'data_store', 'pending_writes', 'lock'):
+            raise AttributeError(name)
+        self.thread.join()
+        return getattr(self.data_store, name)
+
+    def get_data_store(self):
+        """
+        :return: Loaded data store, waiting for it if needed.
+        """
+        self.thread.join()
+        return self.data_store
+
+    @staticmethod
+    def apply(data_store, method, args):
+        if method == 'set_part_block' and not hasattr(data_store, method):
+            set_part_block(data_store, *args)
+        elif method == 'set_behaviour_range' and not hasattr(data_store, method):
+            start, end, behaviour = args
+            set_behaviour_block(data_store, range(start, end), behaviour)
+        else:
+            getattr(data_store, method)(*args)
+
+    @staticmethod
+    def copy_argument(value):
+        # Parts lose their name and likelihood through copy.deepcopy.
+        if isinstance(value, Part):
+            return Part(np.array(value), value.name, value.likelihood)
+        if isinstance(value, Skeleton):
+            return Skeleton(list(value.body_parts), {name: np.array(value[name]) for name in value.body_parts},
+                            {name: value[name].likelihood for name in value.body_parts}, list(value.behaviour),
+                            value.dims)
+        if isinstance(value, (np.ndarray, list)):
+            return value.copy()
+        return value
+
+    def write(self, method, *args):
+        with self.lock:
+            if self.data_store is None:
+                # Callers may reuse the skeletons and arrays they pass in.
+                self.pending_writes.append((method, tuple(self.copy_argument(value) for value in args)))
+                return
+        self.apply(self.data_store, method, args)
+
+    def set_part(self, index, part) -> None:
+        self.write('set_part', index, part)
+
+    def set_part_block(self, indices, name, coordinates, likelihood) -> None:
+        self.write('set_part_block', indices, name, coordinates, likelihood)
+
+    def set_skeleton(self, index, skeleton, force_insert=False) -> None:
+        self.write('set_skeleton', index, skeleton, force_insert)
+
+    def set_behaviour(self, index, behaviour: list) -> None:
+        self.write('set_behaviour', index, behaviour)
+
+    def set_behaviour_range(self, start, end, behaviour: list) -> None:
+        self.write('set_behaviour_range', start, end, behaviour)
+
+    def delete_part(self, index, name, force_remove=False):
+        self.write('delete_part', index, name, force_remove)
+
+    def delete_skeleton(self, index):
+        self.write('delete_skeleton', index)
+
+    def __len__(self):
+        self.thread.join()
+        return len(self.data_store)
@@ -0,0 +1,63 @@
+import numpy as np
+
+from cvkit.pose_estimation import Part
+
+
+def set_part_block(data_store, indices, name, coordinates, likelihood):
+    """
+    Writes a part for many frames with one column assignment per coordinate instead of one set_part call per frame.
+    Stores of unknown flavors, and ranges that would insert new rows, fall back to set_part.
+
+    :param data_store: Target data store.
+    :param indices: Frame numbers to write.
+    :param name: Name of the part.
+    :param coordinates: Array of shape (frames, dimensions).
+    :param likelihood: Likelihood of every written part.
+    """
+    indices = np.asarray(indices)
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    data = data_store.data
+    flavor = data_store.FLAVOR
+    if len(indices) == 0:
+        return
+    if not np.isin(indices, data.index).all():
+        flavor = None
+    if flavor == 'deeplabcut':
+        data.loc[indices, (data_store.scorer, name, 'x')] = coordinates[:, 0]
+        data.loc[indices, (data_store.scorer, name, 'y')] = coordinates[:, 1]
+        data.loc[indices, (data_store.scorer, name, 'likelihood')] = likelihood
+    elif flavor == 'flattened':
+        for i in range(coordinates.shape[1]):
+            values = coordinates[:, i].copy()
+            values[values == data_store.MAGIC_NUMBER] = np.nan
+            data.loc[indices, f'{name}_{i + 1}'] = values
+    elif flavor == 'CVKit3D':
+        data.loc[indices, name] = [str(point) for point in coordinates.tolist()]
+    else:
+        for index, point in zip(indices, coordinates):
+            data_store.set_part(index, Part(point, name, likelihood))
+
+
+def set_behaviour_block(data_store, indices, behaviour):
+    """
+    Writes the same behaviours to many frames with one column assignment instead of one set_behaviour call per frame.
+    Stores of unknown flavors, and ranges that would insert new rows, fall back to set_behaviour.
+
+    :param data_store: Target data store.
+    :param indices: Frame numbers to write.
+    :param behaviour: List of behaviours.
+    """
+    indices = np.asarray(indices)
+    data = data_store.data
+    flavor = data_store.FLAVOR
+    if len(indices) == 0:
+        return
+    if not np.isin(indices, data.index).all():
+        flavor = None
+    if flavor == 'deeplabcut':
+        data.loc[indices, (data_store.scorer, 'behaviour', 'name')] = data_store.BEHAVIOUR_SEP.join(behaviour)
+    elif flavor in ('flattened', 'CVKit3D'):
+        data.loc[indices, 'behaviour'] = data_store.BEHAVIOUR_SEP.join(behaviour)
+    else:
+        for index in indices:
+            data_store.set_behaviour(index, behaviour)
@@ -0,0 +1,254 @@
+import copy
+import json
+import os
+from threading import Lock, Thread
+
+from MuSeqPose.utils.datastore_utils import set_behaviour_block, set_part_block
+from cvkit.pose_estimation import Part
+
+
+def get_journal_path(path):
+    return f'{path}.journal'
+
+
+def get_checkpoint_path(journal_path):
+    return f'{journal_path}.checkpoint'
+
+
+def has_pending_journal(journal_path):
+    """
+    :return: True if the journal, an unfinished compaction or a checkpoint holds edits that are not in the annotation
+        file.
+    """
+    return (os.path.exists(journal_path) and os.path.getsize(journal_path) > 0) or \
+        os.path.exists(f'{journal_path}.compacting') or os.path.exists(get_checkpoint_path(journal_path))
+
+
+class JournaledDataStore:
+
+    def __init__(self, data_store, journal_path=None, max_journal_size=16 * 1024 * 1024):
+        """
+        Wraps a data store so every edit is appended to a journal next to the annotation file. Saving only flushes the
+        journal, the annotation file itself is rewritten by a background compaction. Closing the store folds or drops the
+        journal, so only journals left behind by a crash are replayed when the store is opened.
+
+        A journal that grows past max_journal_size is folded into a checkpoint, a copy of the edited data next to the
+        journal. The annotation file is only rewritten by a save or a close that keeps the edits, so discarding drops
+        checkpointed edits as well.
+
+        :param data_store: Data store to wrap, all other attributes are forwarded to it.
+        :param journal_path: Path of the journal, defaults to the annotation file path with a ``.journal`` suffix.
+        :param max_journal_size: Journal size in bytes that triggers a checkpoint.
+        """
+        self.data_store = data_store
+        self.journal_path = journal_path if journal_path is not None else get_journal_path(data_store.path)
+        # Journal being folded into the annotation file by the running compaction.
+        self.compacting_path = f'{self.journal_path}.compacting'
+        self.checkpoint_path = get_checkpoint_path(self.journal_path)
+        self.max_journal_size = max_journal_size
+        self.lock = Lock()
+        self.compaction_thread = None
+        self.replay()
+        self.journal = open(self.journal_path, 'a')
+
+    def __getattr__(self, name):
+        return getattr(self.data_store, name)
+
+    def __len__(self):
+        return len(self.data_store)
+
+    def replay(self):
+        """
+        Loads the checkpoint and applies the edits of journals left behind by an unfinished session.
+
+        :return: Number of replayed edits.
+        """
+        count = 0
+        if os.path.exists(self.checkpoint_path):
+            checkpoint = type(self.data_store)(self.data_store.body_parts, self.checkpoint_path)
+            self.data_store.data = checkpoint.data
+            print(f'Restored unsaved edits from {self.checkpoint_path}')
+        for path in [self.compacting_path, self.journal_path]:
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r') as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Last line of a journal interrupted mid-write.
+                        break
+                    self.apply(entry)
+                    count += 1
+        if count:
+            print(f'Restored {count} edits from {self.journal_path}')
+        return count
+
+    def apply(self, entry):
+        operation = entry['op']
+        if operation == 'part':
+            self.data_store.set_part(entry['index'], self.build_part(entry['name'], entry['value']))
+        elif operation == 'skeleton':
+            skeleton = self.data_store.get_skeleton(entry['index'])
+            for name, value in entry['parts'].items():
+                skeleton[name] = self.build_part(name, value)
+            skeleton.behaviour = entry['behaviour']
+            self.data_store.set_skeleton(entry['index'], skeleton, force_insert=entry['force_insert'])
+        elif operation == 'part_block':
+            set_part_block(self.data_store, entry['indices'], entry['name'], entry['value'], entry['likelihood'])
+        elif operation == 'behaviour':
+            self.data_store.set_behaviour(entry['index'], entry['behaviour'])
+        elif operation == 'behaviour_range':
+            set_behaviour_block(self.data_store, range(entry['start'], entry['end']), entry['behaviour'])
+        elif operation == 'delete_part':
+            self.data_store.delete_part(entry['index'], entry['name'], entry['force_remove'])
+        elif operation == 'delete_skeleton':
+            self.data_store.delete_skeleton(entry['index'])
+
+    @staticmethod
+    def build_part(name, value):
+        return Part(value[:-1], name, value[-1])
+
+    @staticmethod
+    def encode_part(part):
+        return [float(coordinate) for coordinate in part] + [float(part.likelihood)]
+
+    def append(self, entry):
+        with self.lock:
+            self.journal.write(json.dumps(entry) + '\n')
+            size = self.journal.tell()
+        if size > self.max_journal_size:
+            self.checkpoint()
+
+    def set_part(self, index, part: Part) -> None:
+        self.data_store.set_part(index, part)
+        self.append({'op': 'part', 'index': int(index), 'name': part.name, 'value': self.encode_part(part)})
+
+    def set_part_block(self, indices, name, coordinates, likelihood) -> None:
+        if hasattr(self.data_store, 'set_part_block'):
+            self.data_store.set_part_block(indices, name, coordinates, likelihood)
+        else:
+            set_part_block(self.data_store, indices, name, coordinates, likelihood)
+        self.append({'op': 'part_block', 'indices': [int(index) for index in indices], 'name': name,
+                     'value': [[float(value) for value in point] for point in coordinates],
+                     'likelihood': float(likelihood)})
+
+    def set_skeleton(self, index, skeleton, force_insert=False) -> None:
+        self.data_store.set_skeleton(index, skeleton, force_insert)
+        self.append({'op': 'skeleton', 'index': int(index), 'force_insert': force_insert,
+                     'parts': {name: self.encode_part(skeleton[name]) for name in self.data_store.body_parts},
+                     'behaviour': list(skeleton.behaviour)})
+
+    def set_behaviour(self, index, behaviour: list) -> None:
+        self.data_store.set_behaviour(index, behaviour)
+        self.append({'op': 'behaviour', 'index': int(index), 'behaviour': list(behaviour)})
+
+    def set_behaviour_range(self, start, end, behaviour: list) -> None:
+        if hasattr(self.data_store, 'set_behaviour_range'):
+            self.data_store.set_behaviour_range(start, end, behaviour)
+        else:
+            set_behaviour_block(self.data_store, range(start, end), behaviour)
+        self.append({'op': 'behaviour_range', 'start': int(start), 'end': int(end), 'behaviour': list(behaviour)})
+
+    def delete_part(self, index, name, force_remove=False):
+        self.data_store.delete_part(index, name, force_remove)
+        self.append({'op': 'delete_part', 'index': int(index), 'name': name, 'force_remove': force_remove})
+
+    def delete_skeleton(self, index):
+        self.data_store.delete_skeleton(index)
+        self.append({'op': 'delete_skeleton', 'index': int(index)})
+
+    def has_pending_edits(self):
+        # Edits of a running compaction are saved once it finishes.
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+        if not self.journal.closed:
+            self.flush()
+        return has_pending_journal(self.journal_path)
+
+    def flush(self):
+        with self.lock:
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+
+    def save_file(self, path: str = None) -> None:
+        if path is not None and path != self.data_store.path:
+            self.data_store.save_file(path)
+            return
+        self.flush()
+        self.compact()
+
+    def compact(self):
+        """
+        Folds the journal and the checkpoint into the annotation file in the background. Edits made while the
+        compaction runs go to a fresh journal.
+        """
+        # A running checkpoint holds edits that must reach the annotation file as well.
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+        if self.journal.tell() == 0 and not os.path.exists(self.compacting_path) and \
+                not os.path.exists(self.checkpoint_path):
+            return
+        self.write_in_background(self.data_store.path)
+
+    def checkpoint(self):
+        """
+        Folds the journal into the checkpoint in the background, the annotation file is left as it was last saved.
+        """
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return
+        self.write_in_background(self.checkpoint_path)
+
+    def write_in_background(self, path):
+        """
+        Moves the journal aside and writes a snapshot of the data to path, edits made meanwhile go to a fresh journal.
+        """
+        with self.lock:
+            self.journal.close()
+            if os.path.exists(self.compacting_path):
+                # A previous compaction did not finish, keep its edits in front of the current ones.
+                with open(self.compacting_path, 'a') as compacting, open(self.journal_path, 'r') as journal:
+                    compacting.write(journal.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.compacting_path)
+            self.journal = open(self.journal_path, 'a')
+            # The snapshot is written in the background while edits keep going to the live data frame. A store still
+            # loading in the background is needed from here on.
+            data_store = self.data_store.get_data_store() if hasattr(self.data_store, 'get_data_store') else \
+                self.data_store
+            snapshot = copy.copy(data_store)
+            snapshot.data = data_store.data.copy()
+            self.compaction_thread = Thread(target=self.write_snapshot, args=(snapshot, path), daemon=True)
+            self.compaction_thread.start()
+
+    def write_snapshot(self, snapshot, path):
+        temp_path = f'{path}.part{os.path.splitext(self.data_store.path)[1]}'
+        try:
+            snapshot.save_file(temp_path)
+            os.replace(temp_path, path)
+            # Removed before the moved journal, an interruption in between only replays edits the file already holds.
+            if path != self.checkpoint_path and os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+            os.remove(self.compacting_path)
+        except Exception as ex:
+            print(f'Could not compact {self.journal_path}: {ex}')
+
+    def close(self, discard=False):
+        """
+        Ends the session. Pending edits are folded into the annotation file, or dropped together with the journal and the
+        checkpoint when discard is set.
+        """
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+        if not discard:
+            self.flush()
+            self.compact()
+            if self.compaction_thread is not None:
+                self.compaction_thread.join()
+        with self.lock:
+            self.journal.close()
+        for path in [self.journal_path, self.compacting_path, self.checkpoint_path] if discard else [self.journal_path]:
+            # A failed compaction keeps its journal, it is replayed on the next open.
+            if os.path.exists(path) and (discard or os.path.getsize(path) == 0):
+                os.remove(path)
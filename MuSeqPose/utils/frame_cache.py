@@ -0,0 +1,55 @@
+from collections import OrderedDict
+
+
+class FrameCache:
+
+    def __init__(self, max_bytes):
+        """
+        Least-recently-used cache of decoded frames bounded by a memory budget.
+
+        :param max_bytes: Maximum number of bytes held by the cached frames.
+        """
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, index):
+        frame = self.frames.get(index, None)
+        if frame is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.frames.move_to_end(index)
+        return frame
+
+    def put(self, index, frame):
+        if frame.nbytes > self.max_bytes:
+            return
+        if index in self.frames:
+            self.size -= self.frames.pop(index).nbytes
+        self.frames[index] = frame
+        self.size += frame.nbytes
+        while self.size > self.max_bytes:
+            _, evicted = self.frames.popitem(last=False)
+            self.size -= evicted.nbytes
+
+    def capacity(self, frame):
+        """
+        :return: Number of frames shaped like the given frame that fit in the memory budget.
+        """
+        return self.max_bytes // max(1, frame.nbytes)
+
+    def clear(self):
+        self.frames.clear()
+        self.size = 0
+
+    def get_stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'frames': len(self.frames), 'bytes': self.size}
+
+    def __contains__(self, index):
+        return index in self.frames
+
+    def __len__(self):
+        return len(self.frames)
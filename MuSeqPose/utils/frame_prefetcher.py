@@ -0,0 +1,96 @@
+from collections import deque
+from threading import Thread, Condition
+
+
+class FramePrefetcher:
+
+    def __init__(self, video_reader, buffer_size=32, timeout=0.5):
+        """
+        Decodes frames ahead of the playhead on a worker thread and keeps them in a bounded ring buffer.
+
+        :param video_reader: cvkit video reader used as the frame source.
+        :param buffer_size: Maximum number of decoded frames kept ahead of the playhead.
+        :param timeout: Seconds between checks that the worker is still running while waiting for a frame.
+        """
+        self.video_reader = video_reader
+        self.buffer_size = max(1, buffer_size)
+        self.timeout = timeout
+        self.buffer = deque()
+        self.condition = Condition()
+        self.thread = None
+        self.state = 0
+        self.end_of_stream = False
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        self.state = 1
+        self.end_of_stream = False
+        self.thread = Thread(target=self.fill_buffer)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def fill_buffer(self):
+        while True:
+            with self.condition:
+                while self.state == 1 and len(self.buffer) >= self.buffer_size:
+                    self.condition.wait()
+                if self.state != 1:
+                    break
+            frame = self.video_reader.next_frame()
+            index = self.video_reader.get_current_index()
+            with self.condition:
+                # A flush may have happened while decoding, the frame belongs to the old position.
+                if self.state != 1:
+                    break
+                if frame is None:
+                    self.end_of_stream = True
+                    self.condition.notify_all()
+                    break
+                self.buffer.append((index, frame))
+                self.condition.notify_all()
+
+    def next_frame(self):
+        """
+        Pops the next decoded frame from the ring buffer.
+
+        :return: tuple of frame index and frame. The frame is None once the end of the stream is reached, or if the
+            worker stopped without reaching it.
+        """
+        if self.state != 1:
+            self.start()
+        with self.condition:
+            if len(self.buffer) > 0:
+                self.hits += 1
+            else:
+                self.misses += 1
+            # A slow decode is not the end of the stream, keep waiting as long as the worker runs.
+            while len(self.buffer) == 0 and not self.end_of_stream and self.thread.is_alive():
+                self.condition.wait_for(lambda: len(self.buffer) > 0 or self.end_of_stream, self.timeout)
+            if len(self.buffer) == 0:
+                return self.video_reader.get_current_index(), None
+            index, frame = self.buffer.popleft()
+            self.condition.notify_all()
+        return index, frame
+
+    def seek(self, index):
+        self.stop()
+        self.video_reader.seek_pos(index)
+        self.start()
+
+    def stop(self):
+        with self.condition:
+            self.state = -1
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
+        self.buffer.clear()
+        self.end_of_stream = False
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'buffered': len(self.buffer)}
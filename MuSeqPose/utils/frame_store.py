@@ -0,0 +1,107 @@
+import glob
+import os
+
+import numpy as np
+
+from cvkit.video_readers.decord_reader import DecordReader
+
+
+def get_frame_store_paths(output_path):
+    return f'{output_path}.npy', f'{output_path}_index.npy'
+
+
+def load_frame_indices(output_path):
+    """
+    :return: Frame numbers held by the frame store at the given path or None if the store does not exist.
+    """
+    _, index_path = get_frame_store_paths(output_path)
+    if not os.path.exists(index_path):
+        return None
+    frame_indices = np.load(index_path)
+    return frame_indices[frame_indices >= 0].tolist()
+
+
+def load_legacy_frame_indices(output_path):
+    """
+    Projects from before frame stores kept their candidates as one ``<frame number>.png`` per frame in a folder at
+    the store path.
+
+    :return: Frame numbers of the PNG frames or None if there are none.
+    """
+    file_names = glob.glob(os.path.join(output_path, '*.png'))
+    frame_indices = sorted(int(name) for name in
+                           [os.path.splitext(os.path.basename(file_name))[0] for file_name in file_names]
+                           if name.isdigit())
+    return frame_indices if frame_indices else None
+
+
+def generate_frame_store(video_path, fps, frame_numbers, output_path):
+    """
+    Stores the given frames of a video in a memory-mapped array file, reusing an existing store that already holds
+    all of them.
+
+    :param output_path: Path of the store without extension.
+    :return: :py:class:`FrameStore` with the frames in ascending frame number order.
+    """
+    frame_numbers = sorted(set(frame_numbers))
+    frames_path, index_path = get_frame_store_paths(output_path)
+    stored_indices = load_frame_indices(output_path)
+    if stored_indices is None or not set(frame_numbers).issubset(stored_indices) or not os.path.exists(frames_path):
+        os.makedirs(os.path.dirname(frames_path), exist_ok=True)
+        reader = DecordReader(video_path, fps, 1)
+        frames = None
+        temp_path = f'{output_path}.part.npy'
+        for row, frame_number in enumerate(frame_numbers):
+            frame = reader.random_access_image(frame_number)
+            if frames is None:
+                frames = np.lib.format.open_memmap(temp_path, mode='w+', dtype=frame.dtype,
+                                                   shape=(len(frame_numbers), *frame.shape))
+            frames[row] = frame
+        reader.release()
+        if frames is None:
+            raise ValueError('No frames to store')
+        frames.flush()
+        del frames
+        os.replace(temp_path, frames_path)
+        np.save(index_path, np.array(frame_numbers, dtype=np.int64))
+    return FrameStore(output_path, frame_numbers)
+
+
+class FrameStore:
+
+    def __init__(self, output_path, frame_numbers=None):
+        """
+        Read-only random access to frames kept in a memory-mapped array file. Reading a frame only pages in its rows.
+
+        :param output_path: Path of the store without extension.
+        :param frame_numbers: Frames to expose, defaults to every frame in the store.
+        """
+        self.output_path = output_path
+        self.frames_path, self.index_path = get_frame_store_paths(output_path)
+        self.frames = np.load(self.frames_path, mmap_mode='r')
+        self.stored_indices = np.load(self.index_path)
+        rows = {frame_number: row for row, frame_number in enumerate(self.stored_indices) if frame_number >= 0}
+        if frame_numbers is None:
+            frame_numbers = sorted(rows.keys())
+        self.frame_indices = list(frame_numbers)
+        self.rows = [rows[frame_number] for frame_number in self.frame_indices]
+
+    def random_access_image(self, position):
+        if 0 <= position < len(self.rows):
+            return self.frames[self.rows[position]]
+
+    def delete_frame(self, position):
+        row = self.rows.pop(position)
+        self.frame_indices.pop(position)
+        # Mark the row as deleted in the index so it is not offered again when the store is reopened.
+        self.stored_indices[row] = -1
+        np.save(self.index_path, self.stored_indices)
+
+    def get_number_of_frames(self):
+        return len(self.rows)
+
+    def release(self):
+        self.frames = None
+
+    def __len__(self):
+        return self.get_number_of_frames()
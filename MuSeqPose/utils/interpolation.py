@@ -0,0 +1,27 @@
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+LINEAR = 'Linear'
+CUBIC = 'Cubic'
+
+
+def interpolate_parts(anchor_frames, anchor_points, frames, mode=LINEAR):
+    """
+    Interpolates all parts over a range of frames at once.
+
+    :param anchor_frames: Sorted frame numbers of the annotated anchors, the range lies between the two inner ones.
+    :param anchor_points: Array of shape (anchors, parts, dimensions) with the anchor coordinates.
+    :param frames: Frame numbers to interpolate.
+    :param mode: :py:data:`LINEAR` or :py:data:`CUBIC`. Cubic falls back to linear with only two anchors.
+    :return: Array of shape (frames, parts, dimensions).
+    """
+    anchor_frames = np.asarray(anchor_frames, dtype=np.float64)
+    anchor_points = np.asarray(anchor_points, dtype=np.float64)
+    frames = np.asarray(frames, dtype=np.float64)
+    if mode == CUBIC and len(anchor_frames) > 2:
+        return CubicSpline(anchor_frames, anchor_points, axis=0)(frames)
+    # Linear interpolation only depends on the anchors enclosing the range.
+    start = np.searchsorted(anchor_frames, frames[0], side='right') - 1
+    start = min(max(start, 0), len(anchor_frames) - 2)
+    weights = ((frames - anchor_frames[start]) / (anchor_frames[start + 1] - anchor_frames[start]))[:, None, None]
+    return anchor_points[start] + weights * (anchor_points[start + 1] - anchor_points[start])
@@ -0,0 +1,152 @@
+from bisect import bisect_right
+
+import numpy as np
+
+
+class LikelihoodIndex:
+
+    def __init__(self, data_store, body_parts, number_of_frames, threshold, segment_size=None):
+        """
+        Sorted runs of frames where a part is below the likelihood threshold, one list of [start, end) runs per part.
+        The frames are split into segments that are indexed on the first query reaching them and kept up to date
+        through the write listeners of the data store, so finding the next or previous low-confidence frame is a
+        binary search per segment. Runs are cut at segment boundaries.
+
+        :param number_of_frames: Frames past this number are not indexed.
+        :param segment_size: Frames per segment, defaults to a single segment. Lazily loaded stores use their chunk
+            size so a search only parses the chunks it reaches.
+        """
+        self.data_store = data_store
+        self.body_parts = list(body_parts)
+        self.number_of_frames = number_of_frames
+        self.threshold = threshold
+        self.segment_size = max(1, number_of_frames if segment_size is None else segment_size)
+        # Runs per indexed segment, keyed by segment and then by part.
+        self.starts = {}
+        self.ends = {}
+        data_store.add_write_listener(self.update)
+
+    def get_segment_range(self, segment):
+        return segment * self.segment_size, min((segment + 1) * self.segment_size, self.number_of_frames)
+
+    def get_runs(self, segment, name):
+        """
+        :return: Starts and ends of the runs of a part in a segment, indexing the segment on first use.
+        """
+        if segment not in self.starts:
+            start, end = self.get_segment_range(segment)
+            _, likelihood = self.data_store.get_slice((start, end), self.body_parts)
+            self.starts[segment], self.ends[segment] = {}, {}
+            for idx, part in enumerate(self.body_parts):
+                low = np.concatenate([[False], likelihood[:, idx] < self.threshold, [False]])
+                edges = np.flatnonzero(low[1:] != low[:-1]) + start
+                self.starts[segment][part] = edges[0::2].tolist()
+                self.ends[segment][part] = edges[1::2].tolist()
+        return self.starts[segment][name], self.ends[segment][name]
+
+    def update(self, indices):
+        # Segments that are not indexed yet read the new values once they are.
+        indices = [int(index) for index in indices if
+                   0 <= index < self.number_of_frames and index // self.segment_size in self.starts]
+        if len(indices) == 0:
+            return
+        start, end = min(indices), max(indices) + 1
+        _, likelihood = self.data_store.get_slice((start, end), self.body_parts)
+        for idx, name in enumerate(self.body_parts):
+            for index in indices:
+                self.set_low(name, index, likelihood[index - start, idx] < self.threshold)
+
+    def set_low(self, name, index, low):
+        starts, ends = self.get_runs(index // self.segment_size, name)
+        i = bisect_right(starts, index) - 1
+        inside = i >= 0 and index < ends[i]
+        if low and not inside:
+            joins_left = i >= 0 and ends[i] == index
+            joins_right = i + 1 < len(starts) and starts[i + 1] == index + 1
+            if joins_left and joins_right:
+                ends[i] = ends[i + 1]
+                del starts[i + 1], ends[i + 1]
+            elif joins_left:
+                ends[i] = index + 1
+            elif joins_right:
+                starts[i + 1] = index
+            else:
+                starts.insert(i + 1, index)
+                ends.insert(i + 1, index + 1)
+        elif not low and inside:
+            if starts[i] == index and ends[i] == index + 1:
+                del starts[i], ends[i]
+            elif starts[i] == index:
+                starts[i] = index + 1
+            elif ends[i] == index + 1:
+                ends[i] = index
+            else:
+                starts.insert(i + 1, index + 1)
+                ends.insert(i + 1, ends[i])
+                ends[i] = index
+
+    def previous_annotated_frame(self, frame_number, name):
+        """
+        :return: Last frame before frame_number where the part is at or above the threshold, or None.
+        """
+        frame = min(frame_number, self.number_of_frames) - 1
+        while frame >= 0:
+            segment = frame // self.segment_size
+            starts, ends = self.get_runs(segment, name)
+            i = bisect_right(starts, frame) - 1
+            if i < 0 or frame >= ends[i]:
+                return frame
+            # Runs are maximal within a segment, the frame before a run is annotated unless it is in the previous one.
+            frame = starts[i] - 1
+        return None
+
+    def next_annotated_frame(self, frame_number, name):
+        """
+        :return: First frame after frame_number where the part is at or above the threshold, or None.
+        """
+        frame = max(frame_number + 1, 0)
+        while frame < self.number_of_frames:
+            starts, ends = self.get_runs(frame // self.segment_size, name)
+            i = bisect_right(starts, frame) - 1
+            if i < 0 or frame >= ends[i]:
+                return frame
+            frame = ends[i]
+        return None
+
+    def next_low_frame(self, frame_number, name=None):
+        """
+        :param name: Part to search, defaults to any part.
+        :return: First frame after frame_number with a part below the threshold, or None.
+        """
+        frame = max(frame_number + 1, 0)
+        for segment in range(frame // self.segment_size, (self.number_of_frames - 1) // self.segment_size + 1):
+            frames = []
+            for part in self.body_parts if name is None else [name]:
+                starts, ends = self.get_runs(segment, part)
+                i = bisect_right(starts, frame) - 1
+                if i >= 0 and frame < ends[i]:
+                    frames.append(frame)
+                elif i + 1 < len(starts):
+                    frames.append(starts[i + 1])
+            if frames:
+                return min(frames)
+        return None
+
+    def previous_low_frame(self, frame_number, name=None):
+        """
+        :param name: Part to search, defaults to any part.
+        :return: Last frame before frame_number with a part below the threshold, or None.
+        """
+        frame = min(frame_number, self.number_of_frames) - 1
+        if frame < 0:
+            return None
+        for segment in range(frame // self.segment_size, -1, -1):
+            frames = []
+            for part in self.body_parts if name is None else [name]:
+                starts, ends = self.get_runs(segment, part)
+                i = bisect_right(starts, frame) - 1
+                if i >= 0:
+                    frames.append(min(ends[i] - 1, frame))
+            if frames:
+                return max(frames)
+        return None
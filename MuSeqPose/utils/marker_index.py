@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class MarkerIndex:
+    # Cell rows are packed into the upper half of an int64 key, cell columns shifted to unsigned into the lower half.
+    KEY_OFFSET = 1 << 31
+
+    def __init__(self, cell_size=16.0):
+        """
+        Uniform grid over the visible markers of one frame. The markers are sorted by cell, so the markers of a cell are
+        found with a binary search and a nearest-marker query only looks at the cells within the radius.
+
+        The grid is rebuilt on the first query after :py:meth:`set_points`, frames that are never clicked cost nothing.
+
+        :param cell_size: Edge of a grid cell in scene units.
+        """
+        self.cell_size = cell_size
+        self.coordinates = np.zeros((0, 2))
+        self.visible = np.zeros((0,), dtype=bool)
+        self.stale = True
+        self.keys = np.zeros((0,), dtype=np.int64)
+        self.indices = np.zeros((0,), dtype=np.int64)
+
+    def set_points(self, coordinates, visible):
+        """
+        :param coordinates: Array of shape (markers, 2).
+        :param visible: Mask of the markers that can be hit.
+        """
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        self.visible = np.asarray(visible, dtype=bool)
+        self.stale = True
+
+    @staticmethod
+    def cell_keys(columns, rows):
+        columns = np.asarray(columns, dtype=np.int64) + MarkerIndex.KEY_OFFSET
+        return np.asarray(rows, dtype=np.int64) * (1 << 32) + columns
+
+    def build(self):
+        indices = np.flatnonzero(self.visible & np.all(np.isfinite(self.coordinates), axis=1))
+        cells = np.floor(self.coordinates[indices] / self.cell_size).astype(np.int64)
+        keys = self.cell_keys(cells[:, 0], cells[:, 1])
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.indices = indices[order]
+        self.stale = False
+
+    def nearest(self, x, y, radius=np.inf):
+        """
+        :param radius: Largest distance to a marker centre.
+        :return: Index of the nearest visible marker within radius, or None.
+        """
+        if self.stale:
+            self.build()
+        if len(self.indices) == 0:
+            return None
+        low = np.floor((np.array([x, y]) - radius) / self.cell_size)
+        high = np.floor((np.array([x, y]) + radius) / self.cell_size)
+        if not np.all(np.isfinite([low, high])) or np.prod(high - low + 1) > len(self.indices):
+            # The radius covers more cells than there are markers.
+            candidates = self.indices
+        else:
+            columns, rows = np.meshgrid(np.arange(low[0], high[0] + 1), np.arange(low[1], high[1] + 1))
+            keys = self.cell_keys(columns.ravel(), rows.ravel())
+            starts = np.searchsorted(self.keys, keys, side='left')
+            ends = np.searchsorted(self.keys, keys, side='right')
+            candidates = np.concatenate([self.indices[start:end] for start, end in zip(starts, ends)])
+            if len(candidates) == 0:
+                return None
+        distances = np.hypot(*(self.coordinates[candidates] - [x, y]).T)
+        nearest = int(np.argmin(distances))
+        return int(candidates[nearest]) if distances[nearest] <= radius else None
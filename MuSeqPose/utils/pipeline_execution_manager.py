@@ -67,12 +67,19 @@ class PipelineExecutionManager:
         return out_dict
 
     def execute_next(self):
+        """
+        Starts the next card on the output of the previous one. Cards run in this process, so the output data store is
+        handed on as is, and the previous card releases it so the running card is its only owner.
+        """
         if self.current_index < len(self.pipeline):
-            if self.current_index != 0 and self.pipeline[self.current_index - 1].exception_occurred:
-                QMessageBox.warning(self.pipeline[self.current_index - 1], "Error",
-                                    self.pipeline[self.current_index - 1].exception_message)
-                return
-            args = self.pipeline[self.current_index - 1].get_output()
+            args = None
+            if self.current_index != 0:
+                previous_card = self.pipeline[self.current_index - 1]
+                if previous_card.exception_occurred:
+                    QMessageBox.warning(previous_card, "Error", previous_card.exception_message)
+                    return
+                args = previous_card.get_output()
+                previous_card.release_output()
             self.pipeline[self.current_index].execute(args)
             self.current_index += 1
         else:
@@ -95,6 +102,7 @@ class PipelineExecutionManager:
 
     def delete_pipeline(self):
         for card in self.pipeline:
+            card.release_output()
             try:
                 card.deleteLater()
             except:
@@ -0,0 +1,47 @@
+import time
+
+
+class PlaybackClock:
+
+    def __init__(self, fps, speed_factor=1.0):
+        """
+        Wall-clock schedule for real-time playback. Frames that are already late when the player gets to them are
+        dropped instead of rendered so playback does not drift behind the video.
+
+        :param fps: Frame rate of the video.
+        :param speed_factor: Playback speed multiplier.
+        """
+        self.fps = fps
+        self.speed_factor = speed_factor
+        self.start_time = 0
+        self.start_frame = 0
+        self.displayed = 0
+        self.dropped = 0
+
+    def start(self, frame_number):
+        self.start_time = time.perf_counter()
+        self.start_frame = frame_number
+        self.reset_stats()
+
+    def get_due_frame(self):
+        return self.start_frame + int((time.perf_counter() - self.start_time) * self.fps * self.speed_factor)
+
+    def next_frame(self, frame_number, number_of_frames):
+        """
+        :param frame_number: Frame currently on screen.
+        :param number_of_frames: Total number of frames in the video.
+        :return: Frame that should be rendered now or None if the next frame is not due yet.
+        """
+        due_frame = min(self.get_due_frame(), number_of_frames - 1)
+        if due_frame <= frame_number:
+            return None
+        self.displayed += 1
+        self.dropped += due_frame - frame_number - 1
+        return due_frame
+
+    def reset_stats(self):
+        self.displayed = 0
+        self.dropped = 0
+
+    def get_stats(self):
+        return {'displayed': self.displayed, 'dropped': self.dropped}
@@ -32,7 +32,14 @@ class ProcessorThread(QRunnable):
         self.args = args
 
     def get_output(self):
-        return self.processor.get_output()
+        if self.processor is not None:
+            return self.processor.get_output()
+
+    def release(self):
+        # The runnable may still be unwinding on the pool thread, so only the data is dropped.
+        self.signals.timer.stop()
+        self.processor = None
+        self.args = None
 
 
 class ProcessSignals(QObject):
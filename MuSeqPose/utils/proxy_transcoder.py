@@ -0,0 +1,119 @@
+import json
+import os
+
+import cv2
+
+
+def get_proxy_path(output_folder, view_name, scale):
+    return os.path.join(output_folder, 'proxies', f'{view_name}_{int(round(scale * 100))}.avi')
+
+
+def get_video_size(video_path):
+    stream = cv2.VideoCapture(video_path)
+    size = int(stream.get(cv2.CAP_PROP_FRAME_WIDTH)), int(stream.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    stream.release()
+    return size
+
+
+def get_proxy_source_path(proxy_path):
+    return f'{proxy_path}.json'
+
+
+def is_proxy_valid(video_path, proxy_path):
+    """
+    A proxy is valid while the source has the size and modification time it was transcoded from, copying or restoring
+    a different video over the source invalidates the proxy even if it is older than the proxy.
+    """
+    source_path = get_proxy_source_path(proxy_path)
+    if not os.path.exists(proxy_path) or not os.path.exists(source_path):
+        return False
+    try:
+        with open(source_path) as file:
+            source = json.load(file)
+    except (OSError, ValueError):
+        return False
+    stat = os.stat(video_path)
+    return source.get('file_size') == stat.st_size and source.get('mtime') == stat.st_mtime
+
+
+class ProxyTranscoder:
+
+    def __init__(self, video_path, proxy_path, scale):
+        """
+        Transcodes a video into a reduced-resolution Motion-JPEG proxy. Every frame of the proxy is intra coded, so
+        seeking to any frame costs a single JPEG decode.
+
+        :param video_path: Path of the full-resolution video.
+        :param proxy_path: Output path of the proxy.
+        :param scale: Proxy resolution relative to the source.
+        """
+        self.video_path = video_path
+        self.proxy_path = proxy_path
+        self.scale = scale
+        self.progress = 0
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        """
+        :return: Whether the proxy was written completely.
+        """
+        # The source is stated before reading, a change during the transcode leaves the proxy invalid.
+        stat = os.stat(self.video_path)
+        stream = cv2.VideoCapture(self.video_path)
+        fps = stream.get(cv2.CAP_PROP_FPS)
+        total_frames = max(1, int(stream.get(cv2.CAP_PROP_FRAME_COUNT)))
+        width, height = int(stream.get(cv2.CAP_PROP_FRAME_WIDTH)), int(stream.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        size = max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale)))
+        os.makedirs(os.path.dirname(self.proxy_path), exist_ok=True)
+        # Write next to the destination and rename once complete so an interrupted run never leaves a partial proxy.
+        temp_path = f'{self.proxy_path}.part.avi'
+        writer = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+        completed = True
+        index = 0
+        while True:
+            if self.cancelled:
+                completed = False
+                break
+            ret, frame = stream.read()
+            if not ret:
+                break
+            writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+            index += 1
+            self.progress = index / total_frames
+        writer.release()
+        stream.release()
+        if completed and index > 0:
+            os.replace(temp_path, self.proxy_path)
+            with open(get_proxy_source_path(self.proxy_path), 'w') as file:
+                json.dump({'file_size': stat.st_size, 'mtime': stat.st_mtime}, file)
+            return True
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+
+class ProxyReader:
+
+    def __init__(self, proxy_path):
+        """
+        Random access reader for intra-only proxies. Seeking is a direct jump since no frame depends on another.
+        """
+        self.proxy_path = proxy_path
+        self.stream = cv2.VideoCapture(proxy_path)
+        self.next_index = 0
+
+    def read(self, index):
+        if index != self.next_index:
+            self.stream.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = self.stream.read()
+        if not ret:
+            self.next_index = -1
+            return None
+        self.next_index = index + 1
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def release(self):
+        self.stream.release()
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+class DLTSystem:
+
+    def __init__(self, dlt_coefficients):
+        """
+        DLT coefficients of a set of views, pre-arranged for vectorized reconstruction and projection. The
+        reconstruction system depends on the image coordinates, so only its coefficient blocks can be prepared ahead.
+
+        :param dlt_coefficients: Array of shape (views, 12).
+        """
+        self.coefficients = np.array(dlt_coefficients, dtype=np.float64)
+        self.coefficients.setflags(write=False)
+        self.u_rows = self.coefficients[None, :, 0:4]
+        self.v_rows = self.coefficients[None, :, 4:8]
+        self.denominator_rows = self.coefficients[None, :, 8:12]
+        # Projection matrices of all views side by side, (4, 3 * views), so projecting is one product.
+        self.projection = np.ascontiguousarray(self.coefficients.reshape(-1, 4).T)
+
+    def __len__(self):
+        return len(self.coefficients)
+
+    def reconstruct(self, uvs):
+        """
+        Vectorized form of ``DLT.DLTrecon`` for 3D points, every point is solved in one batched SVD.
+
+        :param uvs: Image coordinates of shape (points, views, 2).
+        :return: Points of shape (points, 3), rounded like ``DLT.DLTrecon``.
+        """
+        uvs = np.asarray(uvs, dtype=np.float64)
+        # Two rows per view, (points, views, 4) each, interleaved to (points, 2 * views, 4).
+        u_rows = self.u_rows - uvs[..., 0:1] * self.denominator_rows
+        v_rows = self.v_rows - uvs[..., 1:2] * self.denominator_rows
+        system = np.stack([u_rows, v_rows], axis=2).reshape(len(uvs), -1, 4)
+        _, _, vh = np.linalg.svd(system)
+        return np.round(vh[:, -1, 0:3] / vh[:, -1, 3:4], 4)
+
+    def project(self, xyz):
+        """
+        Vectorized form of ``DLT.DLTdecon``.
+
+        :param xyz: Points of shape (points, 3).
+        :return: Image coordinates of shape (points, views, 2).
+        """
+        xyz = np.asarray(xyz, dtype=np.float64)
+        homogeneous = (xyz @ self.projection[0:3] + self.projection[3]).reshape(len(xyz), -1, 3)
+        return homogeneous[..., 0:2] / homogeneous[..., 2:3]
+
+
+def reconstruct_points(dlt_coefficients, uvs):
+    """
+    :param dlt_coefficients: Array of shape (views, 12).
+    :param uvs: Image coordinates of shape (points, views, 2).
+    :return: Points of shape (points, 3), see :py:meth:`DLTSystem.reconstruct`.
+    """
+    return DLTSystem(dlt_coefficients).reconstruct(uvs)
+
+
+def project_points(dlt_coefficients, xyz):
+    """
+    :param dlt_coefficients: Array of shape (views, 12).
+    :param xyz: Points of shape (points, 3).
+    :return: Image coordinates of shape (points, views, 2), see :py:meth:`DLTSystem.project`.
+    """
+    return DLTSystem(dlt_coefficients).project(xyz)
+
+
+def reproject_range(source_slices, source_system: DLTSystem, target_system: DLTSystem, threshold):
+    """
+    Reconstructs every frame x part of a range from the source views and projects it into the target views.
+
+    :param source_slices: Per source view, coordinates (frames, parts, >=2) and likelihoods (frames, parts) as returned
+        by ``get_slice``.
+    :param source_system: :py:class:`DLTSystem` of the source views.
+    :param target_system: :py:class:`DLTSystem` of the target views.
+    :param threshold: Minimum likelihood a part needs in every source view to be reconstructed.
+    :return: Image coordinates of shape (target views, frames, parts, 2) and a (frames, parts) mask of the solved
+        entries.
+    """
+    uvs = np.stack([coordinates[..., :2] for coordinates, _ in source_slices], axis=2).astype(np.float64)
+    likelihood = np.stack([likelihood for _, likelihood in source_slices], axis=2)
+    frames, parts = uvs.shape[:2]
+    valid = np.all(likelihood >= threshold, axis=2) & np.all(np.isfinite(uvs), axis=(2, 3))
+    projected = np.zeros((len(target_system), frames, parts, 2))
+    if np.any(valid):
+        xyz = source_system.reconstruct(uvs[valid])
+        projected[:, valid] = target_system.project(xyz).transpose(1, 0, 2)
+    return projected, valid
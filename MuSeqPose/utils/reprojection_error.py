@@ -0,0 +1,185 @@
+from threading import Lock, Thread
+
+import numpy as np
+
+from MuSeqPose.utils.reconstruction import DLTSystem
+
+
+class ReprojectionErrorIndex:
+
+    def __init__(self, data_stores, dlt_system: DLTSystem, body_parts, number_of_frames, threshold, batch_size=4096):
+        """
+        Reprojection error of every frame and part. Each entry is reconstructed from the views where the part is at
+        or above the threshold and holds the largest pixel distance between the projection and the annotation over
+        those views, NaN when fewer than two views qualify or the frame was not computed yet.
+
+        The index is computed in batches on a background thread by :py:meth:`start`. Without it, or for batches the
+        background pass failed on, a query computes the batches it reads. Writes to the data stores mark frames stale
+        and only those frames are recomputed, on the next query.
+
+        :param data_stores: Data stores of the views, in the order of the views of dlt_system.
+        :param dlt_system: :py:class:`DLTSystem` of all views.
+        """
+        self.data_stores = data_stores
+        self.dlt_system = dlt_system
+        self.body_parts = list(body_parts)
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.errors = np.full((number_of_frames, len(self.body_parts)), np.nan, dtype=np.float32)
+        self.computed = np.zeros(((number_of_frames + batch_size - 1) // batch_size,), dtype=bool)
+        # Systems of the view subsets seen so far, keyed by the bit mask of the views.
+        self.subsystems = {}
+        self.lock = Lock()
+        self.dirty_lock = Lock()
+        self.dirty_frames = set()
+        self.progress = 0
+        self.cancelled = False
+        self.thread = None
+        for data_store in data_stores:
+            data_store.add_write_listener(self.mark_dirty)
+
+    def start(self):
+        self.thread = Thread(target=self.compute_all, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled = True
+        if self.thread is not None:
+            self.thread.join()
+
+    def restart(self, dlt_system: DLTSystem):
+        """
+        Recomputes every frame with new DLT coefficients.
+        """
+        background = self.thread is not None
+        self.cancel()
+        self.dlt_system = dlt_system
+        self.subsystems = {}
+        self.errors[:] = np.nan
+        self.computed[:] = False
+        with self.dirty_lock:
+            self.dirty_frames.clear()
+        self.cancelled = False
+        self.progress = 0
+        if background:
+            self.start()
+
+    def get_batch_range(self, batch):
+        return batch * self.batch_size, min((batch + 1) * self.batch_size, len(self.errors))
+
+    def compute_batch(self, batch):
+        start, end = self.get_batch_range(batch)
+        # Holding the lock for the whole batch keeps a refresh from being overwritten by older data.
+        with self.lock:
+            if not self.computed[batch]:
+                self.errors[start:end] = self.compute_errors(start, end)
+                self.computed[batch] = True
+
+    def compute_all(self):
+        for batch in range(len(self.computed)):
+            if self.cancelled:
+                return
+            try:
+                self.compute_batch(batch)
+            except Exception as ex:
+                # The batch stays uncomputed, queries compute it once this pass is over.
+                start, end = self.get_batch_range(batch)
+                print(f'Could not compute the reprojection errors of frames {start} to {end - 1}: {ex}')
+            self.progress = self.get_batch_range(batch)[1] / len(self.errors)
+
+    def ensure_computed(self, start, end):
+        """
+        Computes the batches overlapping frames [start, end) that are not known yet. Batches the background pass has
+        not reached are left to it.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        for batch in range(start // self.batch_size, (end + self.batch_size - 1) // self.batch_size):
+            self.compute_batch(batch)
+
+    def get_subsystem(self, mask):
+        if mask not in self.subsystems:
+            views = [view for view in range(len(self.dlt_system)) if mask & (1 << view)]
+            self.subsystems[mask] = DLTSystem(self.dlt_system.coefficients[views])
+        return self.subsystems[mask]
+
+    def compute_errors(self, start, end):
+        """
+        :return: Errors of frames [start, end) as an array of shape (frames, parts).
+        """
+        slices = [data_store.get_slice((start, end), self.body_parts) for data_store in self.data_stores]
+        uvs = np.stack([coordinates[..., :2] for coordinates, _ in slices], axis=2).astype(np.float64)
+        valid = np.stack([likelihood >= self.threshold for _, likelihood in slices], axis=2) & np.all(
+            np.isfinite(uvs), axis=3)
+        masks = valid.astype(np.int64) @ (1 << np.arange(len(self.data_stores), dtype=np.int64))
+        errors = np.full(masks.shape, np.nan, dtype=np.float32)
+        # Entries are solved in one batch per combination of valid views.
+        for mask in np.unique(masks):
+            views = [view for view in range(len(self.data_stores)) if mask & (1 << view)]
+            if len(views) < 2:
+                continue
+            selected = masks == mask
+            observed = uvs[selected][:, views]
+            subsystem = self.get_subsystem(int(mask))
+            projected = subsystem.project(subsystem.reconstruct(observed))
+            errors[selected] = np.linalg.norm(projected - observed, axis=2).max(axis=1)
+        return errors
+
+    def mark_dirty(self, indices):
+        with self.dirty_lock:
+            self.dirty_frames.update(int(index) for index in indices)
+
+    def refresh(self):
+        """
+        Recomputes the frames written since the last query.
+        """
+        with self.dirty_lock:
+            frames = np.array(sorted(index for index in self.dirty_frames if 0 <= index < len(self.errors)),
+                              dtype=np.int64)
+            self.dirty_frames.clear()
+        if len(frames) == 0:
+            return
+        # One computation per run of consecutive frames.
+        runs = np.split(frames, np.flatnonzero(np.diff(frames) != 1) + 1)
+        with self.lock:
+            for run in runs:
+                self.errors[run[0]:run[-1] + 1] = self.compute_errors(run[0], run[-1] + 1)
+
+    def get_frame_errors(self, part=None, start=0, end=None):
+        """
+        :param part: Name of the part, defaults to the largest error over all parts.
+        :return: Error of every frame in [start, end), -inf where no error is known.
+        """
+        end = len(self.errors) if end is None else end
+        self.refresh()
+        self.ensure_computed(start, end)
+        errors = self.errors[start:end] if part is None else self.errors[start:end, [self.body_parts.index(part)]]
+        return np.where(np.isnan(errors), -np.inf, errors).max(axis=1)
+
+    def find_frame(self, frame_number, threshold, forward=True, part=None):
+        """
+        :return: Nearest frame after (or before) frame_number with an error above threshold, or None. Batches are
+            searched outwards from frame_number, so only the batches up to the found frame are computed.
+        """
+        if len(self.computed) == 0:
+            return None
+        batch = min(max(frame_number, 0) // self.batch_size, len(self.computed) - 1)
+        for batch in range(batch, len(self.computed)) if forward else range(batch, -1, -1):
+            start, end = self.get_batch_range(batch)
+            frames = np.flatnonzero(self.get_frame_errors(part, start, end) > threshold) + start
+            frames = frames[frames > frame_number] if forward else frames[frames < frame_number]
+            if len(frames):
+                return int(frames[0] if forward else frames[-1])
+        return None
+
+    def get_worst_frames(self, count, part=None):
+        """
+        :return: Up to count (frame, error) pairs, largest error first.
+        """
+        errors = self.get_frame_errors(part)
+        count = min(count, int(np.isfinite(errors).sum()))
+        if count == 0:
+            return []
+        frames = np.argpartition(-errors, count - 1)[:count]
+        frames = frames[np.argsort(-errors[frames])]
+        return [(int(frame), float(errors[frame])) for frame in frames]
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+
+try:
+    import decord
+except ImportError:
+    decord = None
+
+
+class SeekIndex:
+    VERSION = 1
+
+    def __init__(self, video_path, keyframes, timestamps, file_size, mtime):
+        """
+        Keyframe positions and presentation timestamps of a video file.
+
+        :param video_path: Path of the indexed video.
+        :param keyframes: Sorted frame numbers of the keyframes.
+        :param timestamps: Presentation timestamp (seconds) of every frame.
+        :param file_size: Size of the video when it was indexed.
+        :param mtime: Modification time of the video when it was indexed.
+        """
+        self.video_path = video_path
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.file_size = file_size
+        self.mtime = mtime
+
+    def get_keyframe(self, index):
+        position = np.searchsorted(self.keyframes, index, side='right') - 1
+        return int(self.keyframes[max(0, position)])
+
+    def get_next_keyframe(self, index):
+        position = np.searchsorted(self.keyframes, index, side='right')
+        if position < len(self.keyframes):
+            return int(self.keyframes[position])
+        return len(self.timestamps)
+
+    def get_timestamp(self, index):
+        return float(self.timestamps[index])
+
+    def is_valid(self, video_path):
+        stat = os.stat(video_path)
+        return stat.st_size == self.file_size and stat.st_mtime == self.mtime
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # np.savez appends the extension to bare paths, write through a handle to keep the name as given.
+        with open(path, 'wb') as file:
+            np.savez(file, version=self.VERSION, video_path=self.video_path, keyframes=self.keyframes,
+                     timestamps=self.timestamps, file_size=self.file_size, mtime=self.mtime)
+
+    @staticmethod
+    def load(path):
+        with np.load(path) as data:
+            if int(data['version']) != SeekIndex.VERSION:
+                return None
+            return SeekIndex(str(data['video_path']), data['keyframes'], data['timestamps'], int(data['file_size']),
+                             float(data['mtime']))
+
+    @staticmethod
+    def build(video_path):
+        if decord is None:
+            return None
+        stat = os.stat(video_path)
+        reader = decord.VideoReader(video_path)
+        keyframes = np.array(reader.get_key_indices(), dtype=np.int64)
+        if len(keyframes) == 0 or keyframes[0] != 0:
+            keyframes = np.concatenate([[0], keyframes])
+        timestamps = reader.get_frame_timestamp(np.arange(len(reader)))[:, 0]
+        del reader
+        return SeekIndex(video_path, keyframes, timestamps, stat.st_size, stat.st_mtime)
+
+
+def get_seek_index_path(output_folder, view_name):
+    return os.path.join(output_folder, 'seek_index', f'{view_name}.npz')
+
+
+def load_seek_index(video_path, index_path):
+    """
+    Loads the sidecar seek index of a video, rebuilding it when it is missing or the video changed since it was built.
+
+    :return: :py:class:`SeekIndex` or None if the video could not be indexed.
+    """
+    seek_index = None
+    if os.path.exists(index_path):
+        try:
+            seek_index = SeekIndex.load(index_path)
+        except Exception as ex:
+            print(f'Could not load seek index {index_path}: {ex}')
+    if seek_index is not None and seek_index.video_path == video_path and seek_index.is_valid(video_path):
+        return seek_index
+    try:
+        seek_index = SeekIndex.build(video_path)
+    except Exception as ex:
+        print(f'Could not index {video_path}: {ex}')
+        return None
+    if seek_index is not None:
+        seek_index.save(index_path)
+    return seek_index
@@ -1,4 +1,14 @@
+import os
+
 from MuSeqPose.config import MuSeqPoseConfig
+from MuSeqPose.utils.chunked_datastore import ChunkedDataStore
+from MuSeqPose.utils.columnar_datastore import ColumnarDataStore
+from MuSeqPose.utils.datastore_cache import DeferredDataStore, load_datastore_cache, save_datastore_cache
+from MuSeqPose.utils.edit_journal import JournaledDataStore, get_journal_path, has_pending_journal
+from MuSeqPose.utils.likelihood_index import LikelihoodIndex
+from MuSeqPose.utils.reconstruction import DLTSystem
+from MuSeqPose.utils.reprojection_error import ReprojectionErrorIndex
+from cvkit.pose_estimation.data_readers import DataStoreInterface, initialize_datastore_reader
 
 
 class SessionManager:
@@ -7,6 +17,14 @@ class SessionManager:
         self.config = config
         self.session_video_readers = {}
         self.session_data_readers = {}
+        self.session_video_players = {}
+        # Data stores shared by every consumer of the same columns of an annotation file.
+        self.session_data_stores = {}
+        # DLT systems per tuple of camera views, cleared whenever coefficients change.
+        self.dlt_systems = {}
+        self.reprojection_error_index = None
+        # Likelihood indices per data store.
+        self.likelihood_indices = {}
         for view in config.views:
             self.session_data_readers[view] = None
             self.session_video_readers[view] = None
@@ -17,6 +35,117 @@ class SessionManager:
         if view in self.session_video_readers:
             self.session_video_readers[view] = reader
 
+    def register_video_player(self, view, player):
+        self.session_video_players[view] = player
+
+    def get_frame(self, view, index):
+        if view in self.session_video_players:
+            return self.session_video_players[view].get_frame(index)
+        return self.session_video_readers[view].random_access_image(index)
+
+    def get_data_store(self, body_parts, path, flavor, journaled=True):
+        """
+        Returns the array-backed data store of an annotation file, loading it on first use. Later calls with the same
+        path and body parts receive the same instance, other columns of the file get a store of their own. A valid binary cache of the file is loaded instead of parsing it, the parsed
+        store is then built in the background and only waited for when saving, edits made meanwhile are served by the
+        arrays and the journal. Otherwise the cache is regenerated in the background after parsing. With lazy annotation loading enabled the file is opened as a
+        :py:class:`ChunkedDataStore` instead.
+
+        :param journaled: Journal edits of a newly loaded store, see :py:class:`JournaledDataStore`.
+        """
+        key = (os.path.abspath(path), tuple(body_parts))
+        if key in self.session_data_stores:
+            return self.session_data_stores[key]
+        if self.config.lazy_annotation_loading:
+            self.session_data_stores[key] = ChunkedDataStore(body_parts, path, flavor, self.config.annotation_chunk_size,
+                                                             int(self.config.annotation_chunk_cache_mb * 1024 * 1024))
+        else:
+            def build_data_store():
+                data_store = initialize_datastore_reader(body_parts, path, flavor)
+                return JournaledDataStore(data_store) if journaled else data_store
+
+            # Journals left behind by a crash hold edits the cache does not know about.
+            pending_journal = journaled and has_pending_journal(get_journal_path(path))
+            cache = load_datastore_cache(path, body_parts, flavor) if not pending_journal else None
+            if cache is not None:
+                data_store = DeferredDataStore(lambda: initialize_datastore_reader(body_parts, path, flavor),
+                                               list(body_parts), path, flavor, int(cache['dimensions']),
+                                               DataStoreInterface.BEHAVIOUR_SEP)
+                # The journal wraps the deferred store so edits are journaled without waiting for the parse.
+                self.session_data_stores[key] = ColumnarDataStore(
+                    JournaledDataStore(data_store) if journaled else data_store, cache)
+            else:
+                stat = os.stat(path) if os.path.exists(path) else None
+                self.session_data_stores[key] = ColumnarDataStore(build_data_store())
+                if stat is not None and not pending_journal:
+                    save_datastore_cache(self.session_data_stores[key], stat)
+        return self.session_data_stores[key]
+
+    def get_dlt_system(self, views) -> DLTSystem:
+        """
+        Returns the :py:class:`DLTSystem` of a list of camera views, built on first use.
+        """
+        key = tuple(views)
+        if key not in self.dlt_systems:
+            self.dlt_systems[key] = DLTSystem([self.config.views[view].dlt_coefficients for view in key])
+        return self.dlt_systems[key]
+
+    def invalidate_dlt_systems(self):
+        self.dlt_systems.clear()
+        if self.reprojection_error_index is not None:
+            self.reprojection_error_index.restart(self.get_dlt_system(self.get_reprojection_cameras()))
+
+    def get_reprojection_views(self):
+        return [view for view in self.config.annotation_views if
+                self.config.annotation_views[view].view is not None and view in self.session_video_players]
+
+    def get_reprojection_cameras(self):
+        return [self.config.annotation_views[view].view for view in self.get_reprojection_views()]
+
+    def get_reprojection_error_index(self) -> ReprojectionErrorIndex:
+        """
+        Returns the reprojection error index of the annotation views with a camera view, starting its computation on
+        first use. Lazily loaded annotation files are not read whole in the background, their errors are computed for
+        the frames a query reads.
+        """
+        if self.reprojection_error_index is None:
+            players = [self.session_video_players[view] for view in self.get_reprojection_views()]
+            self.reprojection_error_index = ReprojectionErrorIndex(
+                [player.data_store for player in players], self.get_dlt_system(self.get_reprojection_cameras()),
+                self.config.body_parts, max(player.get_number_of_frames() for player in players),
+                self.config.threshold)
+            if not any([isinstance(player.data_store, ChunkedDataStore) for player in players]):
+                self.reprojection_error_index.start()
+        return self.reprojection_error_index
+
+    def get_likelihood_index(self, data_store, number_of_frames) -> LikelihoodIndex:
+        """
+        Returns the :py:class:`LikelihoodIndex` of a data store, creating it on first use. Lazily loaded stores are
+        indexed one chunk at a time as searches reach them.
+        """
+        key = (os.path.abspath(data_store.path), tuple(data_store.body_parts))
+        if key not in self.likelihood_indices:
+            segment_size = self.config.annotation_chunk_size if isinstance(data_store, ChunkedDataStore) else None
+            self.likelihood_indices[key] = LikelihoodIndex(data_store, data_store.body_parts, number_of_frames,
+                                                           self.config.threshold, segment_size)
+        return self.likelihood_indices[key]
+
+    def has_unsaved_edits(self):
+        return any([data_store.has_pending_edits() for data_store in self.session_data_stores.values() if
+                    hasattr(data_store, 'has_pending_edits')])
+
+    def release(self, discard_edits=False):
+        """
+        Closes the shared data stores, after the players and views using them were released.
+
+        :param discard_edits: Drop the edits that were not saved instead of writing them to the annotation files.
+        """
+        if self.reprojection_error_index is not None:
+            self.reprojection_error_index.cancel()
+        for data_store in self.session_data_stores.values():
+            data_store.close(discard_edits)
+        self.session_data_stores.clear()
+
     def register_data_reader(self, view, reader):
         if view in self.session_data_readers:
             self.session_data_readers[view] = reader
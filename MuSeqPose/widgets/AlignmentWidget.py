@@ -46,7 +46,7 @@ class AlignmentDialog(QDialog):
                 continue
             self.ui.select_views.layout().addWidget(self.checkboxes[index])
             widget = AnnotationImageViewer()
-            widget.draw_frame(session_manager.session_video_readers[view].random_access_image(self.frame_number))
+            widget.draw_frame(session_manager.get_frame(view, self.frame_number))
             if not max_init:
                 self.max_frames = len(session_manager.session_video_readers[view])
                 max_init = True
@@ -86,6 +86,7 @@ class AlignmentDialog(QDialog):
             QMessageBox.warning(self, "Error", "Need at least 2 views for alignment")
             return
         ret = update_alignment_matrices(self.config, alignment_source)
+        self.session_manager.invalidate_dlt_systems()
         if ret:
             QMessageBox.information(self, "Success", f"Alignment matrices generated\nComputed Scale:{round(self.config.computed_scale,2)}")
         else:
@@ -113,5 +114,4 @@ class AlignmentDialog(QDialog):
     def change_frame(self, frame_number):
         self.frame_number = min(max(frame_number, 0), self.max_frames)
         for i, view in enumerate(self.views):
-            self.widgets[i].draw_frame(
-                self.session_manager.session_video_readers[view].random_access_image(self.frame_number))
+            self.widgets[i].draw_frame(self.session_manager.get_frame(view, self.frame_number))
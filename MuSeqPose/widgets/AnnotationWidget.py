@@ -1,18 +1,21 @@
 from datetime import timedelta
 
-from PySide2.QtCore import QTimer, Signal
-from PySide2.QtWidgets import QVBoxLayout, QButtonGroup, QCheckBox, QMessageBox
+import numpy as np
+from PySide2.QtCore import QTimer, Signal, Qt
+from PySide2.QtWidgets import QVBoxLayout, QButtonGroup, QCheckBox, QMessageBox, QListWidgetItem
 
 from MuSeqPose.player_interface import VideoPlayer
-from MuSeqPose.ui_Skeleton import SkeletonController
+from MuSeqPose.ui_Skeleton import BatchedSkeletonController, SkeletonController
+from MuSeqPose.utils.interpolation import CUBIC, interpolate_parts
 from MuSeqPose.utils.session_manager import SessionManager
 from MuSeqPose.widgets.ImageViewer import AnnotationImageViewer
 from MuSeqPose.widgets.PlayControlWidget import PlayControlWidget
-from MuSeqPose.widgets.ui_KeyPoint import KeyPointController
+from MuSeqPose.widgets.ui_KeyPoint import CheckListModel, KeyPointDelegate, KeyPointListModel
 
 
 class AnnotationWidget(PlayControlWidget):
     reproject = Signal(str, int, list, list)
+    reproject_range = Signal(str, int, int, list, list)
 
     def update_frame_number(self):
         self.frame_number = self.video_player.frame_number
@@ -27,23 +30,25 @@ class AnnotationWidget(PlayControlWidget):
         layout.addWidget(self.ui)
         self.ui.reprojectionToolBox.setVisible(self.config.reprojection_toolbox_enabled)
         self.setLayout(layout)
-        self.annotation_button_group = QButtonGroup()
-        self.visibility_button_group = QButtonGroup()
-        self.visibility_button_group.setExclusive(False)
         self.behaviour_button_group = QButtonGroup()
         self.behaviour_button_group.setExclusive(False)
-        self.interp_button_group = QButtonGroup()
-        self.interp_button_group.setExclusive(False)
-        self.reprojection_parts_button_group = QButtonGroup()
-        self.reprojection_parts_button_group.setExclusive(False)
         self.reprojection_views_button_group = QButtonGroup()
         self.reprojection_views_button_group.setExclusive(False)
-        self.keypoint_list = []
-        self.current_keypoint = None
+        # Per part lists are models, their views only paint the visible rows.
+        self.keypoint_model = KeyPointListModel(self.config.body_parts, self.config.colors, self)
+        self.ui.keypointView.setModel(self.keypoint_model)
+        self.ui.keypointView.setItemDelegate(KeyPointDelegate(self.ui.keypointView))
+        self.interp_model = CheckListModel(self.config.body_parts, self)
+        self.ui.interpolationView.setModel(self.interp_model)
+        self.reprojection_parts_model = CheckListModel(self.config.body_parts, self)
+        self.ui.reprojKeypointView.setModel(self.reprojection_parts_model)
+        # Frames [overwrite_start, overwrite_end) passed in overwrite mode, written as one range.
+        self.overwrite_start = None
+        self.overwrite_end = None
+        self.overwrite_behaviour = []
         self.image_viewer = AnnotationImageViewer()
         self.image_viewer.scroll_keypoint.connect(self.scroll_keypoint)
-        self.image_viewer.select_keypoint.connect(
-            lambda id, state: self.annotation_button_group.button(id).setChecked(state))
+        self.image_viewer.select_keypoint.connect(self.select_keypoint)
         self.image_viewer.modify_keypoint.connect(self.modify_selected_keypoint)
         self.image_viewer.delete_keypoint.connect(self.set_keypoint_likelihood)
         self.ui.view_container.addWidget(self.image_viewer)
@@ -52,21 +57,16 @@ class AnnotationWidget(PlayControlWidget):
         self.interp_candidate_set = set()
         self.interp_initial_index_frame = 0
         self.ui.interpSetCurrentIndex.clicked.connect(self.interp_update_initial_index_set)
-        for idx, (name, color) in enumerate(zip(self.config.body_parts, self.config.colors)):
-            kp_ui = KeyPointController(idx, name, color)
-            self.keypoint_list.append(kp_ui)
-            self.ui.keypoint_container.addWidget(kp_ui)
-            self.visibility_button_group.addButton(kp_ui.visibility_checkbox, id=kp_ui.id)
-            self.annotation_button_group.addButton(kp_ui.annotation_radio_button, id=kp_ui.id)
-            btn = QCheckBox(name)
-            self.interp_button_group.addButton(btn, idx)
-            self.ui.interpolationList.addWidget(btn)
-            if self.config.reprojection_toolbox_enabled:
-                reprojection_btn = QCheckBox(name)
-                self.reprojection_parts_button_group.addButton(reprojection_btn, idx)
-                self.ui.reprojKeypointList.addWidget(reprojection_btn)
         if self.config.reprojection_toolbox_enabled:
             self.ui.reprojectButton.clicked.connect(self.reproject_parts)
+            self.ui.reprojectRangeButton.clicked.connect(self.reproject_parts_range)
+            self.ui.reprojStartFrame.setMaximum(self.video_player.get_number_of_frames() - 1)
+            self.ui.reprojEndFrame.setMaximum(self.video_player.get_number_of_frames() - 1)
+            self.ui.previousErrorButton.clicked.connect(lambda event: self.seek_reprojection_error(False))
+            self.ui.nextErrorButton.clicked.connect(lambda event: self.seek_reprojection_error(True))
+            self.ui.worstFramesButton.clicked.connect(self.list_worst_frames)
+            self.ui.worstFramesList.itemClicked.connect(
+                lambda item: self.seek_ui_input(item.data(Qt.UserRole)))
             for idx, view in enumerate(self.config.annotation_views):
                 reprojection_btn = QCheckBox(view)
                 self.reprojection_views_button_group.addButton(reprojection_btn, idx)
@@ -75,17 +75,24 @@ class AnnotationWidget(PlayControlWidget):
             btn = QCheckBox(behaviour)
             self.behaviour_button_group.addButton(btn, id=idx)
             self.ui.behaviourList.addWidget(btn)
-        self.behaviour_button_group.idToggled.connect(self.set_behaviour)
-        self.interp_button_group.idToggled.connect(self.interp_set_candidate)
-        self.current_keypoint = self.keypoint_list[0]
-        self.video_player.data_point_drawer = SkeletonController(self.session_manager, threshold)
-        self.annotation_button_group.idToggled.connect(self.change_keypoint)
-        self.visibility_button_group.idToggled.connect(self.set_keypoint_likelihood)
-        self.current_keypoint.annotation_radio_button.setChecked(True)
+            self.ui.behaviourSelector.addItem(behaviour)
+        self.behaviour_button_group.idToggled.connect(self.toggle_behaviour)
+        self.ui.overwrite_btn.toggled.connect(self.toggle_overwrite)
+        self.ui.previousBehaviourButton.clicked.connect(lambda event: self.seek_behaviour(False))
+        self.ui.nextBehaviourButton.clicked.connect(lambda event: self.seek_behaviour(True))
+        self.interp_model.toggled.connect(self.interp_set_candidate)
+        skeleton_controller = BatchedSkeletonController if self.config.batched_skeleton_rendering else \
+            SkeletonController
+        self.video_player.data_point_drawer = skeleton_controller(self.session_manager, threshold)
+        self.keypoint_model.keypoint_selected.connect(self.change_keypoint)
+        self.keypoint_model.toggled.connect(self.set_keypoint_likelihood)
+        self.keypoint_model.select(0)
         self.ui.toolBox.setCurrentIndex(0)
+        # Behaviour checkbox states last shown, the panel refresh only touches the checkboxes whose state changes.
+        self.shown_behaviour = np.array([btn.isChecked() for btn in self.behaviour_button_group.buttons()], dtype=bool)
         self.render_next_frame()
         self.timer = QTimer()
-        self.timer.timeout.connect(self.render_next_frame)
+        self.timer.timeout.connect(self.play_next_frame)
         self.ui.seekBar.setMaximum(self.video_player.get_number_of_frames())
         self.ui.seekBar.valueChanged.connect(lambda: self.seek_ui_input(self.ui.seekBar.value()))
         self.ui.seekBar.setTracking(False)
@@ -93,83 +100,139 @@ class AnnotationWidget(PlayControlWidget):
         self.ui.interpSelectAllButton.clicked.connect(self.interp_select_all)
         self.ui.interpClearAllButton.clicked.connect(self.interp_clear_all)
         self.ui.interpolateButton.clicked.connect(self.interpolate)
+        self.ui.previousUncertainButton.clicked.connect(lambda event: self.seek_uncertain_frame(False))
+        self.ui.nextUncertainButton.clicked.connect(lambda event: self.seek_uncertain_frame(True))
 
     def scroll_keypoint(self, offset):
-        current_id = self.keypoint_list.index(self.current_keypoint)
-        new_id = current_id + offset
-        new_id = 0 if new_id < 0 else len(self.keypoint_list) - 1 if new_id >= len(self.keypoint_list) else new_id
-        self.annotation_button_group.button(new_id).setChecked(True)
+        new_id = self.keypoint_model.selected + offset
+        new_id = 0 if new_id < 0 else len(self.config.body_parts) - 1 if new_id >= len(
+            self.config.body_parts) else new_id
+        self.keypoint_model.select(new_id)
 
     def reproject_parts(self, event):
         view_candidates = [btn.text() for btn in self.reprojection_views_button_group.buttons() if btn.isChecked()]
-        part_candidates = [btn.text() for btn in self.reprojection_parts_button_group.buttons() if btn.isChecked()]
+        part_candidates = self.reprojection_parts_model.checked_names()
         if len(view_candidates) > 1 and len(part_candidates) > 0:
             self.reproject.emit(self.view_name, self.frame_number, view_candidates, part_candidates)
 
+    def reproject_parts_range(self, event):
+        view_candidates = [btn.text() for btn in self.reprojection_views_button_group.buttons() if btn.isChecked()]
+        part_candidates = self.reprojection_parts_model.checked_names()
+        start, end = self.ui.reprojStartFrame.value(), self.ui.reprojEndFrame.value()
+        if len(view_candidates) > 1 and len(part_candidates) > 0 and start <= end:
+            self.reproject_range.emit(self.view_name, start, end + 1, view_candidates, part_candidates)
+
+    def seek_uncertain_frame(self, forward):
+        self.video_player.commit_data_point()
+        likelihood_index = self.session_manager.get_likelihood_index(self.video_player.data_store,
+                                                                     self.video_player.get_number_of_frames())
+        name = self.keypoint_model.selected_name() if self.ui.uncertainScope.currentIndex() == 0 else None
+        if forward:
+            frame_number = likelihood_index.next_low_frame(self.frame_number, name)
+        else:
+            frame_number = likelihood_index.previous_low_frame(self.frame_number, name)
+        if frame_number is not None:
+            self.seek_ui_input(frame_number)
+
+    def seek_reprojection_error(self, forward):
+        self.video_player.commit_data_point()
+        frame_number = self.session_manager.get_reprojection_error_index().find_frame(
+            self.frame_number, self.ui.errorThreshold.value(), forward)
+        if frame_number is not None:
+            self.seek_ui_input(frame_number)
+
+    def list_worst_frames(self, event=None, count=100):
+        self.video_player.commit_data_point()
+        self.ui.worstFramesList.clear()
+        for frame_number, error in self.session_manager.get_reprojection_error_index().get_worst_frames(count):
+            item = QListWidgetItem(f'{frame_number}: {error:.1f} px')
+            item.setData(Qt.UserRole, frame_number)
+            self.ui.worstFramesList.addItem(item)
+
+    def select_keypoint(self, id, state):
+        if state:
+            self.keypoint_model.select(id)
+
     def change_keypoint(self, id, state):
         if state:
-            self.current_keypoint = self.keypoint_list[id]
-            self.ui.scrollArea_2.ensureWidgetVisible(self.current_keypoint)
+            self.ui.keypointView.scrollTo(self.keypoint_model.index(id))
         self.video_player.data_point_drawer.mark_selected(self.config.body_parts[id], state)
 
+    def print_fps(self):
+        status = f'FPS: {self.frame_number - self.fps_last_frame_number}'
+        stats = self.video_player.get_prefetch_stats()
+        if stats is not None:
+            status += f' | Prefetch Hits: {stats["hits"]} Misses: {stats["misses"]}'
+        stats = self.video_player.get_cache_stats()
+        if stats is not None:
+            status += f' | Cache Hits: {stats["hits"]} Misses: {stats["misses"]} ({stats["frames"]} frames)'
+        status += self.get_playback_status()
+        self.update_status.emit(status)
+        self.fps_last_frame_number = self.frame_number
+
     def get_timestamp(self, frame_number):
         return str(timedelta(seconds=round(frame_number / self.video_player.video_reader.fps, 3)))
 
     def render_next_frame(self, redraw=None):
         if type(redraw) == bool and redraw:
-            self.image_viewer.draw_frame(self.video_player.current_frame)
+            self.video_player.present_frame(self.image_viewer)
         else:
             self.frame_number = self.video_player.render_next_frame(self.image_viewer)
         self.ui.frameNumber.setText(
             f'<html style="font-weight:600">Frame-Number: {self.frame_number}/{self.video_player.get_number_of_frames()}</html>')
         self.ui.timestamp.setText(f'<html style="font-weight:600">{self.get_timestamp(self.frame_number)}</html>')
-        self.update_annotation_ui(self.video_player.data_point)
+        if self.ui.overwrite_btn.isChecked():
+            self.extend_overwrite()
         self.draw_markers()
         self.ui.seekBar.blockSignals(True)
         self.ui.seekBar.setValue(self.frame_number)
         self.ui.seekBar.blockSignals(False)
 
+    def set_proxy_mode(self, enabled):
+        if self.video_player.set_proxy_mode(enabled):
+            self.render_next_frame(True)
+        return self.video_player.use_proxy
+
+    def play_next_frame(self):
+        frame_number = self.get_due_frame(self.frame_number, self.video_player.get_number_of_frames())
+        if frame_number is None:
+            return
+        if frame_number != self.frame_number + 1:
+            self.video_player.skip(frame_number)
+        self.render_next_frame()
+
     def update_annotation_ui(self, skeleton):
-        for idx, part in enumerate(self.config.body_parts):
-            self.keypoint_list[idx].visibility_checkbox.blockSignals(True)
-            if skeleton[part] >= self.threshold:
-                self.keypoint_list[idx].visibility_checkbox.setChecked(True)
-            else:
-                self.keypoint_list[idx].visibility_checkbox.setChecked(False)
-            self.keypoint_list[idx].visibility_checkbox.blockSignals(False)
-            self.keypoint_list[idx].first_click = True
-        self.behaviour_button_group.blockSignals(True)
-        for i, btn in enumerate(self.behaviour_button_group.buttons()):
-            if self.ui.overwrite_btn.isChecked():
-                self.set_behaviour(i, btn.isChecked())
-            elif self.config.behaviours[i] in self.video_player.data_point.behaviour:
-                btn.setChecked(True)
-                self.set_behaviour(i, True)
-            else:
-                btn.setChecked(False)
-                self.set_behaviour(i, False)
-        self.behaviour_button_group.blockSignals(False)
+        """
+        Shows the state of a skeleton in the panel. Only rows and checkboxes whose state differs from the shown one are
+        repainted, and nothing is written to the data store.
+        """
+        self.keypoint_model.set_checked(
+            [skeleton[part].likelihood >= self.threshold for part in self.config.body_parts])
+        if not self.ui.overwrite_btn.isChecked():
+            behaviour = np.array([name in skeleton.behaviour for name in self.config.behaviours], dtype=bool)
+            self.behaviour_button_group.blockSignals(True)
+            for idx in np.flatnonzero(behaviour != self.shown_behaviour):
+                self.behaviour_button_group.button(idx).setChecked(bool(behaviour[idx]))
+            self.behaviour_button_group.blockSignals(False)
+            self.shown_behaviour = behaviour
         self.interp_update_candidates()
 
     def modify_selected_keypoint(self, point):
-        name = self.current_keypoint.name
-        if self.current_keypoint.visibility_checkbox.isChecked() or self.current_keypoint.first_click:
-            self.current_keypoint.first_click = False
-            self.visibility_button_group.blockSignals(True)
-            self.current_keypoint.visibility_checkbox.setChecked(True)
-            self.visibility_button_group.blockSignals(False)
-            self.video_player.data_point[name][:2] = point.x(), point.y()
-            self.video_player.data_point[name].likelihood = 1.0
-            self.video_player.data_store.set_part(self.frame_number, self.video_player.data_point[name])
-            self.draw_markers()
+        name = self.keypoint_model.selected_name()
+        self.keypoint_model.set_row_checked(self.keypoint_model.selected, True)
+        self.video_player.data_point[name][:2] = point.x(), point.y()
+        self.video_player.data_point[name].likelihood = 1.0
+        self.video_player.mark_dirty(name)
+        self.draw_markers()
 
     def set_keypoint_likelihood(self, id, state):
-        keypoint = self.keypoint_list[id] if id >= 0 else self.current_keypoint
-        name = keypoint.name
+        id = id if id >= 0 else self.keypoint_model.selected
+        name = self.config.body_parts[id]
         if state:
-            keypoint.annotation_radio_button.setChecked(True)
+            self.keypoint_model.select(id)
         self.video_player.data_point[name].likelihood = 0.0 if not state else self.threshold
-        self.video_player.data_store.set_part(self.frame_number, self.video_player.data_point[name])
+        self.video_player.mark_dirty(name)
+        self.keypoint_model.set_row_checked(id, state)
         self.draw_markers()
 
     def draw_markers(self):
@@ -182,23 +245,67 @@ class AnnotationWidget(PlayControlWidget):
         if checked:
             if self.config.behaviours[id] not in self.video_player.data_point.behaviour:
                 self.video_player.data_point.behaviour.append(self.config.behaviours[id])
+                self.video_player.mark_dirty()
         else:
             if self.config.behaviours[id] in self.video_player.data_point.behaviour:
                 self.video_player.data_point.behaviour.remove(self.config.behaviours[id])
-        self.video_player.data_store.set_behaviour(self.frame_number, self.video_player.data_point.behaviour)
+                self.video_player.mark_dirty()
+
+    def toggle_behaviour(self, id, checked):
+        self.shown_behaviour[id] = checked
+        if self.ui.overwrite_btn.isChecked():
+            # The new selection applies from the current frame on.
+            self.overwrite_end = self.frame_number
+            self.commit_overwrite()
+            self.begin_overwrite()
+        else:
+            self.set_behaviour(id, checked)
+
+    def toggle_overwrite(self, checked):
+        if checked:
+            self.begin_overwrite()
+        else:
+            self.commit_overwrite()
+
+    def begin_overwrite(self):
+        self.overwrite_start = self.frame_number
+        self.overwrite_end = self.frame_number + 1
+        self.overwrite_behaviour = [btn.text() for btn in self.behaviour_button_group.buttons() if btn.isChecked()]
+        self.video_player.data_point.behaviour = list(self.overwrite_behaviour)
+
+    def extend_overwrite(self):
+        # Playback may skip frames, those are part of the range. Any other jump past the range starts a new one.
+        if self.overwrite_start is not None and self.overwrite_start <= self.frame_number and (
+                self.is_video_playing or self.frame_number <= self.overwrite_end):
+            self.overwrite_end = max(self.overwrite_end, self.frame_number + 1)
+            self.video_player.data_point.behaviour = list(self.overwrite_behaviour)
+        else:
+            self.commit_overwrite()
+            self.begin_overwrite()
+
+    def commit_overwrite(self):
+        if self.overwrite_start is not None:
+            self.video_player.data_store.set_behaviour_range(self.overwrite_start, self.overwrite_end,
+                                                             self.overwrite_behaviour)
+        self.overwrite_start = None
+
+    def seek_behaviour(self, forward):
+        self.commit_overwrite()
+        self.video_player.commit_data_point()
+        frame_number = self.video_player.data_store.find_behaviour(self.frame_number,
+                                                                   self.ui.behaviourSelector.currentText(), forward)
+        if frame_number is not None:
+            self.seek_ui_input(frame_number)
 
     def interp_update_candidates(self):
-        for idx, name in enumerate(self.config.body_parts):
-            if name in self.interp_initial_index_set and self.keypoint_list[idx].visibility_checkbox.isChecked():
-                self.interp_button_group.button(idx).setChecked(True)
-            else:
-                self.interp_button_group.button(idx).setChecked(False)
+        self.interp_model.set_checked(self.keypoint_model.checked & np.array(
+            [name in self.interp_initial_index_set for name in self.config.body_parts], dtype=bool))
 
     def interp_set_candidate(self, id, state):
         name = self.config.body_parts[id]
-        self.interp_button_group.blockSignals(True)
+        visible = self.keypoint_model.checked[id]
         if self.frame_number == self.interp_initial_index_frame:
-            if state and self.keypoint_list[id].visibility_checkbox.isChecked():
+            if state and visible:
                 self.interp_initial_index_set.add(name)
                 self.interp_candidate_set.add(name)
             else:
@@ -206,31 +313,29 @@ class AnnotationWidget(PlayControlWidget):
                     self.interp_initial_index_set.remove(name)
                 if name in self.interp_candidate_set:
                     self.interp_candidate_set.remove(name)
-                self.interp_button_group.button(id).setChecked(False)
+                self.interp_model.set_row_checked(id, False)
         else:
-            if state and name in self.interp_initial_index_set and self.keypoint_list[
-                id].visibility_checkbox.isChecked():
+            if state and name in self.interp_initial_index_set and visible:
                 self.interp_candidate_set.add(name)
             else:
                 if name in self.interp_candidate_set:
                     self.interp_candidate_set.remove(name)
-                self.interp_button_group.button(id).setChecked(False)
-        self.interp_button_group.blockSignals(False)
+                self.interp_model.set_row_checked(id, False)
 
     def interp_update_initial_index_set(self, event=None):
-        self.interp_initial_index_set = set([self.keypoint_list[i].name for i in range(len(self.keypoint_list)) if
-                                             self.keypoint_list[i].visibility_checkbox.isChecked() and
-                                             self.keypoint_list[i].name in self.interp_candidate_set])
+        self.interp_initial_index_set = set(
+            [name for name, visible in zip(self.config.body_parts, self.keypoint_model.checked) if
+             visible and name in self.interp_candidate_set])
         self.interp_initial_index_frame = self.frame_number
         self.ui.interpInitialIndex.setText(str(self.frame_number))
 
     def interp_select_all(self, event):
-        for btn in self.interp_button_group.buttons():
-            btn.setChecked(True)
+        for idx in np.flatnonzero(~self.interp_model.checked):
+            self.interp_model.setData(self.interp_model.index(int(idx)), Qt.Checked, Qt.CheckStateRole)
 
     def interp_clear_all(self, event):
-        for btn in self.interp_button_group.buttons():
-            btn.setChecked(False)
+        for idx in np.flatnonzero(self.interp_model.checked):
+            self.interp_model.setData(self.interp_model.index(int(idx)), Qt.Unchecked, Qt.CheckStateRole)
 
     def interpolate(self, event):
         total_frames = self.frame_number - self.interp_initial_index_frame
@@ -242,14 +347,31 @@ class AnnotationWidget(PlayControlWidget):
                 return
         if total_frames < 2:
             return
-        for name in self.interp_candidate_set:
-            part_initial = self.video_player.data_store.get_part(self.interp_initial_index_frame, name)
-            part_initial.likelihood = 1.0
-            part_current = self.video_player.data_store.get_part(self.frame_number, name)
-            additive_coordinates = (part_current - part_initial) / total_frames
-            for i in range(self.interp_initial_index_frame, self.frame_number):
-                self.video_player.data_store.set_part(i, part_initial)
-                part_initial += additive_coordinates
+        self.video_player.commit_data_point()
+        names = sorted(self.interp_candidate_set)
+        if len(names) == 0:
+            return
+        data_store = self.video_player.data_store
+        mode = self.ui.interpMode.currentText()
+        likelihood_index = self.session_manager.get_likelihood_index(data_store,
+                                                                     self.video_player.get_number_of_frames())
+        # Parts with the same anchors are interpolated together.
+        anchor_groups = {}
+        for name in names:
+            anchor_frames = (self.interp_initial_index_frame, self.frame_number)
+            if mode == CUBIC:
+                # The nearest annotated frame on each side pins the spline tangents to the surrounding track.
+                anchor_frames = tuple(frame_number for frame_number in [
+                    likelihood_index.previous_annotated_frame(self.interp_initial_index_frame, name), *anchor_frames,
+                    likelihood_index.next_annotated_frame(self.frame_number, name)] if frame_number is not None)
+            anchor_groups.setdefault(anchor_frames, []).append(name)
+        frames = np.arange(self.interp_initial_index_frame, self.frame_number)
+        for anchor_frames, group in anchor_groups.items():
+            anchor_points = np.array(
+                [[data_store.get_part(frame_number, name) for name in group] for frame_number in anchor_frames])
+            points = interpolate_parts(anchor_frames, anchor_points, frames, mode)
+            for idx, name in enumerate(group):
+                data_store.set_part_block(frames, name, points[:, idx], 1.0)
 
     def seek(self, frame_number):
         if self.frame_number != frame_number and frame_number < self.video_player.get_number_of_frames():
@@ -266,6 +388,7 @@ class AnnotationWidget(PlayControlWidget):
             self.fps_timer.stop()
             self.timer.stop()
             self.is_video_playing = False
+            self.set_proxy_mode(False)
             self.ui.nextFrameButton.setEnabled(True)
             self.ui.speedFactor.setEnabled(True)
             self.ui.prevFrameButton.setEnabled(True)
@@ -273,6 +396,8 @@ class AnnotationWidget(PlayControlWidget):
 
         else:
             factor = self.ui.speedFactor.value()
+            self.set_proxy_mode(True)
+            self.start_playback_clock(self.frame_number, self.video_player.video_reader.fps, factor)
             self.timer.start(int((1000 / self.video_player.video_reader.fps) / factor))
             self.fps_timer.start(1000)
             self.ui.playPauseButton.setText('Pause')
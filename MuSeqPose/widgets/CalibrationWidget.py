@@ -9,11 +9,11 @@ from PySide2.QtWidgets import QDialog, QRadioButton, QMessageBox, QShortcut
 
 from MuSeqPose import get_resource
 from MuSeqPose.ui_Skeleton import Marker
+from MuSeqPose.utils.frame_store import generate_frame_store
 from MuSeqPose.utils.session_manager import SessionManager
 from MuSeqPose.widgets.ImageViewer import AnnotationImageViewer
 from cvkit.pose_estimation import Part
 from cvkit.pose_estimation.reconstruction.EasyWand_tools import generate_EasyWand_data
-from cvkit.video_readers.image_sequence_reader import generate_image_sequence_reader
 
 
 class CalibrationDialog(QDialog):
@@ -45,10 +45,10 @@ class CalibrationDialog(QDialog):
         for index, view in enumerate(self.config.views):
             widget = AnnotationImageViewer()
             source_reader = session_manager.session_video_readers[view]
-            self.video_readers[view] = generate_image_sequence_reader(source_reader.video_path,
-                                                                      source_reader.fps, frame_indices,
-                                                                      os.path.join(self.config.output_folder,
-                                                                                   'calibration', 'candidates', view))
+            self.video_readers[view] = generate_frame_store(source_reader.video_path, source_reader.fps,
+                                                            frame_indices,
+                                                            os.path.join(self.config.output_folder, 'calibration',
+                                                                         'candidates', view))
             widget.draw_frame(self.video_readers[view].random_access_image(self.frame_number))
             self.views.append(view)
             widget.select_keypoint.connect(self.change_keypoint)
@@ -65,7 +65,7 @@ class CalibrationDialog(QDialog):
                     self.config.calibration_static_points[i - self.config.num_parts]]
                 self.markers[view][i].setX(pos[0] - 2)
                 self.markers[view][i].setY(pos[1] - 2)
-        self.frame_indices = [int(os.path.basename(path).split('.')[0]) for path in self.video_readers[view].images]
+        self.frame_indices = list(self.video_readers[view].frame_indices)
         self.setLayout(self.ui.layout())
         self.ui.frame_slider.setMinimum(0)
         self.ui.frame_slider.setMaximum(len(self.frame_indices) - 1)
@@ -107,7 +107,7 @@ class CalibrationDialog(QDialog):
             return
         self.frame_number = min(0, self.frame_number - 1)
         self.frame_indices.pop(delete_frame_number)
-        # Only ImageSequenceReader supports frame deletion.
+        # Only FrameStore supports frame deletion.
         for reader in self.video_readers.values():
             reader.delete_frame(delete_frame_number)
         self.ui.frame_slider.setMaximum(len(self.frame_indices) - 1)
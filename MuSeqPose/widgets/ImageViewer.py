@@ -1,10 +1,9 @@
-from PIL import Image
-from PIL.ImageQt import ImageQt
+import numpy as np
 from PySide2.QtCore import Signal, QRectF, QPointF
-from PySide2.QtGui import Qt, QPixmap
+from PySide2.QtGui import Qt, QPixmap, QImage, QTransform, QCursor
 from PySide2.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QFrame
 
-from MuSeqPose.ui_Skeleton import Marker, SkeletonController
+from MuSeqPose.ui_Skeleton import SkeletonController
 
 
 class ImageViewer(QGraphicsView):
@@ -25,9 +24,12 @@ class ImageViewer(QGraphicsView):
         self.setCursor(Qt.CrossCursor)
         self.zoom_flag = False
         self.zoom_times = 0
+        self.frame_buffer = None
+        # Skeleton controllers whose graphics items are registered with the scene.
+        self.skeleton_overlays = []
 
     def fitInView(self) -> None:
-        rect = QRectF(self.pixmap_item.pixmap().rect())
+        rect = self.pixmap_item.sceneBoundingRect()
         if not rect.isNull():
             self.setSceneRect(rect)
             unity = self.transform().mapRect(QRectF(0, 0, 1, 1))
@@ -67,27 +69,59 @@ class ImageViewer(QGraphicsView):
             self.setDragMode(QGraphicsView.NoDrag)
         super().keyReleaseEvent(event)
 
-    def draw_frame(self, frame):
-        pixmap = QPixmap.fromImage(ImageQt(Image.fromarray(frame)))
+    def draw_frame(self, frame, display_size=None):
+        """
+        :param frame: Image to draw.
+        :param display_size: (width, height) the frame covers in scene coordinates, used to stretch reduced-resolution
+                             frames over the full-resolution scene. Defaults to the frame size.
+        """
+        pixmap = QPixmap.fromImage(self.wrap_frame(frame))
         self.pixmap_item.setPixmap(pixmap)
+        if display_size is None:
+            self.pixmap_item.setTransform(QTransform())
+        else:
+            self.pixmap_item.setTransform(
+                QTransform.fromScale(display_size[0] / pixmap.width(), display_size[1] / pixmap.height()))
         self.update()
 
+    def wrap_frame(self, frame):
+        # QImage wraps the decoder buffer without copying, so the array has to outlive the image.
+        self.frame_buffer = np.ascontiguousarray(frame)
+        height, width = self.frame_buffer.shape[:2]
+        if self.frame_buffer.ndim == 2:
+            image_format = QImage.Format_Grayscale8
+        elif self.frame_buffer.shape[2] == 4:
+            image_format = QImage.Format_RGBA8888
+        else:
+            image_format = QImage.Format_RGB888
+        return QImage(self.frame_buffer.data, width, height, self.frame_buffer.strides[0], image_format)
+
+    def attach_skeleton(self, skeleton: SkeletonController):
+        """
+        Registers the graphics items of a skeleton with the scene. They stay in the scene and are only moved or hidden
+        by :py:meth:`SkeletonController.update_skeleton` afterwards.
+        """
+        if skeleton in self.skeleton_overlays:
+            return
+        for item in skeleton.graphics_items():
+            self.scene.addItem(item)
+        self.skeleton_overlays.append(skeleton)
+
+    def detach_skeleton(self, skeleton: SkeletonController):
+        if skeleton not in self.skeleton_overlays:
+            return
+        for item in skeleton.graphics_items():
+            self.scene.removeItem(item)
+        self.skeleton_overlays.remove(skeleton)
+
     def draw_skeleton(self, skeleton: SkeletonController):
-        # TODO Redesign drawing, no need to remove and add graphics items on every update.
-        for line in skeleton.lines:
-            if line in self.scene.items():
-                pass  # self.scene.removeItem(line)
-            else:
-                self.scene.addItem(line)
-        for marker in skeleton.markers.values():
-            if marker in self.scene.items():
-                pass  # self.scene.removeItem(marker)
-            else:
-                self.scene.addItem(marker)
+        self.attach_skeleton(skeleton)
         self.update()
 
 
 class AnnotationImageViewer(ImageViewer):
+    # Distance in screen pixels within which a click picks a marker.
+    PICK_RADIUS = 6
     delete_keypoint = Signal(int, bool)
     modify_keypoint = Signal(QPointF)
     scroll_keypoint = Signal(int)
@@ -101,20 +135,44 @@ class AnnotationImageViewer(ImageViewer):
         if event.button() == Qt.MidButton and not self.zoom_flag:
             self.delete_keypoint.emit(-1, False)
         if event.button() == Qt.LeftButton and not self.zoom_flag:
-            new_position = self.pixmap_item.mapFromScene(self.mapToScene(event.pos()))
-            clicked_item = self.scene.itemAt(new_position, self.transform())
-            if type(clicked_item) == Marker:
-                self.select_keypoint.emit(clicked_item.idx, True)
-                self.selected_marker = clicked_item
+            new_position = self.mapToScene(event.pos())
+            idx = self.marker_at(new_position, self.PICK_RADIUS / self.transform().m11())
+            if idx is not None:
+                self.select_keypoint.emit(idx, True)
+                self.selected_marker = idx
         if event.button() == Qt.RightButton and not self.zoom_flag:
-            new_position = self.pixmap_item.mapFromScene(self.mapToScene(event.pos()))
+            new_position = self.mapToScene(event.pos())
             self.modify_keypoint.emit(new_position)
         super().mousePressEvent(event)
 
+    def keyPressEvent(self, event) -> None:
+        if event.key() == Qt.Key_S and not self.zoom_flag:
+            self.select_nearest_marker()
+        super().keyPressEvent(event)
+
+    def marker_at(self, position, radius=None):
+        """
+        :param position: Position in scene coordinates.
+        :return: Index of the nearest visible marker of the topmost skeleton with one within radius, or None.
+        """
+        for skeleton in reversed(self.skeleton_overlays):
+            idx = skeleton.marker_at(position, radius)
+            if idx is not None:
+                return idx
+        return None
+
+    def select_nearest_marker(self):
+        """
+        Selects the visible marker nearest to the cursor, however far it is.
+        """
+        idx = self.marker_at(self.mapToScene(self.mapFromGlobal(QCursor.pos())), np.inf)
+        if idx is not None:
+            self.select_keypoint.emit(idx, True)
+
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton and self.selected_marker is not None:
-            new_position = self.pixmap_item.mapFromScene(self.mapToScene(event.pos()))
-            self.select_keypoint.emit(self.selected_marker.idx, True)
+            new_position = self.mapToScene(event.pos())
+            self.select_keypoint.emit(self.selected_marker, True)
             self.modify_keypoint.emit(new_position)
             self.selected_marker = None
         super().mouseReleaseEvent(event)
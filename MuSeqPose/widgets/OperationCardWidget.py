@@ -163,6 +163,13 @@ class OperationCard(QWidget):
         if len(self.processor_threads) > 0:
             return self.processor_threads[0].get_output()
 
+    def release_output(self):
+        """
+        Drops the data held by the processors of the last run, once their output was handed on or is discarded.
+        """
+        for processor_thread in self.processor_threads:
+            processor_thread.release()
+
     def delete_operation_clicked(self, event):
         if not self.configurable:
             return
@@ -208,6 +215,8 @@ class OperationCard(QWidget):
         self.setStyleSheet(self._backup_stylesheet + css)
 
     def reset_operation(self):
+        self.release_output()
+        self.processor_threads.clear()
         self.set_css('')
         self.exception_occurred = False
         self.exception_message = ''
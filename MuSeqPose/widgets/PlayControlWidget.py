@@ -4,6 +4,7 @@ from PySide2.QtCore import QFile, QTimer, Signal
 from PySide2.QtUiTools import QUiLoader
 from PySide2.QtWidgets import QWidget
 
+from MuSeqPose.utils.playback_clock import PlaybackClock
 from MuSeqPose.utils.session_manager import SessionManager
 
 
@@ -31,14 +32,57 @@ class PlayControlWidget(QWidget, ABC, metaclass=MetaClass):
         self.ui.seekButton.clicked.connect(self.seek_ui_input)
         self.ui.seekBar.setMinimum(0)
         self.ui.seekBar.setTracking(False)
+        self.ui.seekBar.sliderPressed.connect(self.begin_scrub)
+        self.ui.seekBar.sliderReleased.connect(self.end_scrub)
         self.fps_timer = QTimer()
         self.fps_timer.timeout.connect(self.print_fps)
         self.fps_last_frame_number = 0
+        self.playback_clock = None
 
     def print_fps(self):
-        self.update_status.emit(f'FPS: {self.frame_number - self.fps_last_frame_number}')
+        self.update_status.emit(f'FPS: {self.frame_number - self.fps_last_frame_number}{self.get_playback_status()}')
         self.fps_last_frame_number = self.frame_number
 
+    def get_playback_status(self):
+        if self.playback_clock is None:
+            return ''
+        stats = self.playback_clock.get_stats()
+        return f' | Displayed: {stats["displayed"]} Dropped: {stats["dropped"]}'
+
+    def start_playback_clock(self, frame_number, fps, speed_factor=1.0):
+        if self.config.realtime_playback:
+            self.playback_clock = PlaybackClock(fps, speed_factor)
+            self.playback_clock.start(frame_number)
+        else:
+            self.playback_clock = None
+
+    def get_due_frame(self, frame_number, number_of_frames):
+        """
+        :param frame_number: Frame currently on screen.
+        :param number_of_frames: Total number of frames in the video.
+        :return: Frame to render on this timer tick or None if the next frame is not due yet.
+        """
+        if self.playback_clock is None:
+            return frame_number + 1
+        return self.playback_clock.next_frame(frame_number, number_of_frames)
+
+    def set_proxy_mode(self, enabled):
+        """
+        Switches the views between low-resolution proxies and full-resolution video.
+
+        :return: Whether any view is decoding a proxy.
+        """
+        return False
+
+    def begin_scrub(self):
+        # Proxies seek cheaply enough to follow the slider while it is dragged.
+        self.ui.seekBar.setTracking(self.set_proxy_mode(True))
+
+    def end_scrub(self):
+        self.ui.seekBar.setTracking(False)
+        if not self.is_video_playing:
+            self.set_proxy_mode(False)
+
     @abstractmethod
     def update_frame_number(self):
         pass
@@ -80,7 +80,12 @@ class ProcessorConfigurator(QDialog):
                     attrs[attr] = self.ui_map[attr].get_output()
             return self.target_processor(**attrs)
         else:
-            copy = deepcopy(self.target_processor)
+            # Values replaced below are shared instead of copied, and data left attached by an earlier run is dropped.
+            memo = {id(getattr(self.target_processor, attr, None)): getattr(self.target_processor, attr, None) for attr
+                    in self.target_processor.META_DATA}
+            if getattr(self.target_processor, '_data_store', None) is not None:
+                memo[id(self.target_processor._data_store)] = None
+            copy = deepcopy(self.target_processor, memo)
             for attr, value in self.target_processor.META_DATA.items():
                 if value.param_type == ProcessorMetaData.GLOBAL_CONFIG:
                     setattr(copy, attr, self.config)
@@ -1,9 +1,11 @@
 import math
+from concurrent.futures import ThreadPoolExecutor
 
 from PySide2.QtCore import QTimer
 from PySide2.QtWidgets import QVBoxLayout
 
 from MuSeqPose.player_interface.PlotPlayer import PlotPlayer
+from MuSeqPose.player_interface.VideoPlayer import VideoPlayer
 from MuSeqPose.utils.session_manager import SessionManager
 from MuSeqPose.widgets.ImageViewer import ImageViewer
 from MuSeqPose.widgets.PlayControlWidget import PlayControlWidget
@@ -15,9 +17,13 @@ class SyncViewWidget(PlayControlWidget):
         pass
 
     def render_next_frame(self, event=None):
+        decoded = self.decode_next_frames()
         for player, viewer in zip(self.video_players, self.image_viewers):
-            # if viewer is None:
-            player.render_next_frame(viewer)
+            if isinstance(player, VideoPlayer):
+                if decoded[player]:
+                    player.present_frame(viewer)
+            else:
+                player.render_next_frame(viewer)
         self.frame_number = self.video_players[-1].frame_number
         self.ui.seekBar.blockSignals(True)
         self.ui.seekBar.setValue(self.frame_number)
@@ -25,6 +31,52 @@ class SyncViewWidget(PlayControlWidget):
         self.ui.frameNumber.setText(
             f'<html style="font-weight:600">{self.frame_number}/{self.video_players[0].get_number_of_frames()}</html>')
 
+    def get_current_frame(self):
+        # Plot players count the next frame rather than the shown one, follow a video view when there is one.
+        for player in self.video_players:
+            if isinstance(player, VideoPlayer):
+                return player.frame_number
+        return self.frame_number
+
+    def set_proxy_mode(self, enabled):
+        players = [player for player in self.video_players if isinstance(player, VideoPlayer)]
+        swapped = self.decode_pool.map(lambda player: player.set_proxy_mode(enabled), players)
+        for player, frame_swapped in zip(players, list(swapped)):
+            if frame_swapped:
+                player.present_frame(self.image_viewers[self.video_players.index(player)])
+        return any([player.use_proxy for player in players])
+
+    def play_next_frame(self):
+        current_frame = self.get_current_frame()
+        frame_number = self.get_due_frame(current_frame, self.video_players[0].get_number_of_frames())
+        if frame_number is None:
+            return
+        if frame_number != current_frame + 1:
+            for player in self.video_players:
+                player.skip(frame_number)
+        self.render_next_frame()
+
+    def decode_next_frames(self):
+        players = [player for player in self.video_players if isinstance(player, VideoPlayer)]
+        if len(players) == 0:
+            return {}
+        # Frame barrier: every view decodes the same index and the pixmaps are uploaded once all of them are done.
+        target_index = max([player.next_index for player in players])
+        for player in players:
+            player.next_index = target_index
+        # Only decoding runs on the pool, data store writes and reads stay on the GUI thread.
+        frames = list(self.decode_pool.map(VideoPlayer.decode_frame, players))
+        return {player: player.load_frame(index, frame) for player, (index, frame) in zip(players, frames)}
+
+    def release(self):
+        self.timer.stop()
+        self.fps_timer.stop()
+        self.decode_pool.shutdown(wait=True)
+
+    def closeEvent(self, event):
+        self.release()
+        super().closeEvent(event)
+
     def reset_view(self, event=None):
         for viewer in self.image_viewers:
             if viewer is not None:
@@ -41,11 +93,14 @@ class SyncViewWidget(PlayControlWidget):
             self.fps_timer.stop()
             self.timer.stop()
             self.is_video_playing = False
+            self.set_proxy_mode(False)
             self.ui.nextFrameButton.setEnabled(True)
             self.ui.prevFrameButton.setEnabled(True)
             self.ui.playPauseButton.setText('Play')
         else:
+            self.set_proxy_mode(True)
             self.render_next_frame()
+            self.start_playback_clock(self.get_current_frame(), self.video_players[0].video_reader.fps)
             self.fps_timer.start(1000)
             self.timer.start(int(1000 / self.video_players[0].video_reader.fps))
             self.ui.playPauseButton.setText('Pause')
@@ -57,9 +112,11 @@ class SyncViewWidget(PlayControlWidget):
         super(SyncViewWidget, self).__init__(session_manager, ui_file, threshold, parent)
         self.video_players = video_players
         self.image_viewers = []
+        self.decode_pool = ThreadPoolExecutor(
+            max_workers=max(1, len([player for player in video_players if isinstance(player, VideoPlayer)])))
         self.frame_number = 0
         self.timer = QTimer()
-        self.timer.timeout.connect(self.render_next_frame)
+        self.timer.timeout.connect(self.play_next_frame)
         self.is_video_playing = False
         if len(video_players) > 2:
             rows = math.ceil(len(video_players) / 3)
@@ -1,51 +1,151 @@
+import numpy as np
 from PySide2.QtCore import *
 from PySide2.QtGui import *
 from PySide2.QtWidgets import *
 
 
-class KeyPointController(QWidget):
-    keypoint_selected = Signal(int)
-    keypoint_visibility_toggled = Signal(int)
-
-    def __init__(self, id, name, color):
-        super().__init__()
-        self.id = id
-        self.name = name
-        self.first_click = True
-        self.horizontalLayout = QHBoxLayout(self)
-        self.horizontalLayout.setObjectName(u"horizontalLayout")
-        self.annotation_radio_button = QRadioButton(self)
-        self.annotation_radio_button.setObjectName(u"isSelected")
-        self.annotation_radio_button.setEnabled(True)
-        self.annotation_radio_button.setAutoExclusive(False)
-        self.horizontalLayout.addWidget(self.annotation_radio_button)
-
-        self.label = QLabel(self)
-        self.label.setText(f'<html><b>{self.name}</b></html>')
-        self.label.setObjectName(u"label")
-        self.label.setAlignment(Qt.AlignCenter)
-
-        self.horizontalLayout.addWidget(self.label)
-
-        self.visibility_checkbox = QCheckBox(self)
-        self.visibility_checkbox.setObjectName(u"isChecked")
-        self.visibility_checkbox.setLayoutDirection(Qt.RightToLeft)
-        self.horizontalLayout.addWidget(self.visibility_checkbox)
-
-        self.horizontalLayout.setStretch(1, 1)
-
-        self.setStyleSheet(f"""QCheckBox::indicator::checked{{
-                                background-color:rgb({color[0]},{color[1]},{color[2]});
-                                }}
-                           QCheckBox::indicator{{
-                           border:2px solid rgb({max(10, color[0] - 30)},{max(10, color[1] - 30)},{max(10, color[2] - 30)});
-                           }}""")
-        self.show()
-
-    def mousePressEvent(self, event: QMouseEvent) -> None:
-        super().mousePressEvent(event)
-        if event.button() == Qt.LeftButton:
-            self.annotation_radio_button.setChecked(True)
-            self.keypoint_selected.emit(self.id)
-            if self.first_click:
-                self.visibility_checkbox.setChecked(True)
+class CheckListModel(QAbstractListModel):
+    toggled = Signal(int, bool)
+
+    def __init__(self, names, parent=None):
+        """
+        Checkable list of names, the check states are one boolean array. Views only query the rows they paint, so the
+        cost of a list does not grow with the number of names.
+        """
+        super().__init__(parent)
+        self.names = list(names)
+        self.checked = np.zeros(len(self.names), dtype=bool)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.names[index.row()]
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self.checked[index.row()] else Qt.Unchecked
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsUserCheckable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """
+        Check state changes made in a view, these emit toggled.
+        """
+        if role != Qt.CheckStateRole or not index.isValid():
+            return False
+        state = Qt.CheckState(value) == Qt.Checked
+        self.set_row_checked(index.row(), state)
+        self.toggled.emit(index.row(), state)
+        return True
+
+    def set_row_checked(self, row, state):
+        if self.checked[row] != state:
+            self.checked[row] = state
+            self.dataChanged.emit(self.index(row), self.index(row), [Qt.CheckStateRole])
+
+    def set_checked(self, checked):
+        """
+        Sets all check states without emitting toggled, the views repaint the span of changed rows once.
+        """
+        checked = np.asarray(checked, dtype=bool)
+        changed = np.flatnonzero(checked != self.checked)
+        self.checked = checked.copy()
+        if len(changed):
+            self.dataChanged.emit(self.index(int(changed[0])), self.index(int(changed[-1])), [Qt.CheckStateRole])
+
+    def checked_names(self):
+        return [self.names[idx] for idx in np.flatnonzero(self.checked)]
+
+
+class KeyPointListModel(CheckListModel):
+    ColorRole = Qt.UserRole
+    SelectedRole = Qt.UserRole + 1
+    keypoint_selected = Signal(int, bool)
+
+    def __init__(self, names, colors, parent=None):
+        """
+        Body parts of the skeleton. The check state of a row is the visibility of the part in the shown skeleton and
+        one row is selected for annotation.
+        """
+        super().__init__(names, parent)
+        self.colors = [QColor(int(color[0]), int(color[1]), int(color[2])) for color in colors]
+        self.selected = -1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role == KeyPointListModel.ColorRole:
+            return self.colors[index.row()]
+        if index.isValid() and role == KeyPointListModel.SelectedRole:
+            return index.row() == self.selected
+        return super().data(index, role)
+
+    def select(self, row):
+        if row == self.selected:
+            return
+        previous, self.selected = self.selected, row
+        if previous >= 0:
+            self.dataChanged.emit(self.index(previous), self.index(previous), [KeyPointListModel.SelectedRole])
+            self.keypoint_selected.emit(previous, False)
+        self.dataChanged.emit(self.index(row), self.index(row), [KeyPointListModel.SelectedRole])
+        self.keypoint_selected.emit(row, True)
+
+    def selected_name(self):
+        return self.names[self.selected]
+
+
+class KeyPointDelegate(QStyledItemDelegate):
+
+    def __init__(self, parent=None):
+        """
+        Paints a :py:class:`KeyPointListModel` row as a selection marker, the part name and a visibility box filled with
+        the part colour. Pressing the box toggles the visibility, pressing anywhere else selects the part and shows it.
+        """
+        super().__init__(parent)
+
+    @staticmethod
+    def indicator_rect(option):
+        size = min(option.rect.height() - 8, 14)
+        return QRect(option.rect.right() - size - 6, option.rect.center().y() - size // 2, size, size)
+
+    @staticmethod
+    def marker_rect(option):
+        size = min(option.rect.height() - 8, 12)
+        return QRect(option.rect.left() + 6, option.rect.center().y() - size // 2, size, size)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        color = index.data(KeyPointListModel.ColorRole)
+        painter.setPen(QPen(option.palette.color(QPalette.Text), 1))
+        painter.setBrush(option.palette.color(QPalette.Text) if index.data(
+            KeyPointListModel.SelectedRole) else Qt.NoBrush)
+        painter.drawEllipse(self.marker_rect(option))
+        font = QFont(option.font)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.drawText(option.rect, Qt.AlignCenter, index.data(Qt.DisplayRole))
+        border = QColor(max(10, color.red() - 30), max(10, color.green() - 30), max(10, color.blue() - 30))
+        painter.setPen(QPen(border, 2))
+        painter.setBrush(color if index.data(Qt.CheckStateRole) == Qt.Checked else Qt.NoBrush)
+        painter.drawRect(self.indicator_rect(option))
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), option.fontMetrics.height() + 12)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonDblClick:
+            return True
+        if event.type() != QEvent.MouseButtonPress or event.button() != Qt.LeftButton:
+            return False
+        visible = index.data(Qt.CheckStateRole) == Qt.Checked
+        if self.indicator_rect(option).contains(event.pos()):
+            model.setData(index, Qt.Unchecked if visible else Qt.Checked, Qt.CheckStateRole)
+        else:
+            model.select(index.row())
+            if not visible:
+                model.setData(index, Qt.Checked, Qt.CheckStateRole)
+        return True
@@ -0,0 +1,76 @@
+"""
+Compares the time to open an annotation file by parsing the CSV against loading its binary cache, and the time from
+opening it until the first edit returns.
+
+Usage: python benchmarks/datastore_open_benchmark.py [--frames 108000] [--parts 12]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from MuSeqPose.utils.columnar_datastore import ColumnarDataStore
+from MuSeqPose.utils.datastore_cache import DeferredDataStore, load_datastore_cache, save_datastore_cache
+from MuSeqPose.utils.edit_journal import JournaledDataStore
+from cvkit.pose_estimation import Part
+from cvkit.pose_estimation.data_readers import DataStoreInterface, initialize_datastore_reader
+
+
+def write_deeplabcut_file(path, body_parts, frames):
+    rng = np.random.default_rng(0)
+    columns = pd.MultiIndex.from_tuples(
+        [('benchmark', part, coordinate) for part in body_parts for coordinate in ('x', 'y', 'likelihood')] +
+        [('benchmark', 'behaviour', 'name')], names=['scorer', 'bodyparts', 'coords'])
+    values = rng.random((frames, len(body_parts) * 3)) * 1000
+    data = pd.DataFrame(values, columns=columns[:-1])
+    data[('benchmark', 'behaviour', 'name')] = np.where(rng.random(frames) < 0.1, 'rearing', '')
+    data.to_csv(path)
+
+
+def open_csv(path, body_parts):
+    return ColumnarDataStore(JournaledDataStore(initialize_datastore_reader(body_parts, path, 'deeplabcut')))
+
+
+def open_cache(path, body_parts):
+    cache = load_datastore_cache(path, body_parts, 'deeplabcut')
+    # The parsed store is only needed for saving, it keeps loading after the store is returned.
+    data_store = DeferredDataStore(lambda: initialize_datastore_reader(body_parts, path, 'deeplabcut'), body_parts,
+                                   path, 'deeplabcut', int(cache['dimensions']), DataStoreInterface.BEHAVIOUR_SEP)
+    return ColumnarDataStore(JournaledDataStore(data_store), cache)
+
+
+def time_to_first_edit(open_store, path, body_parts):
+    start = time.perf_counter()
+    store = open_store(path, body_parts)
+    opened_s = time.perf_counter() - start
+    store.set_part(0, Part([1.0, 2.0], body_parts[0], 1.0))
+    return store, opened_s, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=108000)
+    parser.add_argument('--parts', type=int, default=12)
+    args = parser.parse_args()
+    body_parts = [f'part_{i}' for i in range(args.parts)]
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'annotation.csv')
+        write_deeplabcut_file(path, body_parts, args.frames)
+        stat = os.stat(path)
+        save_datastore_cache(ColumnarDataStore(initialize_datastore_reader(body_parts, path, 'deeplabcut')), stat,
+                             background=False)
+        store, csv_s, csv_edit_s = time_to_first_edit(open_csv, path, body_parts)
+        store.close(discard=True)
+        cached_store, cache_s, cache_edit_s = time_to_first_edit(open_cache, path, body_parts)
+        assert np.array_equal(store.coordinates, cached_store.coordinates)
+        cached_store.close(discard=True)
+        print(f'{"frames":>8} {"parts":>6} {"":>6} {"open (s)":>9} {"first edit (s)":>15}')
+        print(f'{args.frames:>8} {args.parts:>6} {"CSV":>6} {csv_s:>9.3f} {csv_edit_s:>15.3f}')
+        print(f'{"":>8} {"":>6} {"cache":>6} {cache_s:>9.3f} {cache_edit_s:>15.3f}')
+
+
+if __name__ == "__main__":
+    main()
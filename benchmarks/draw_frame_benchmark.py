@@ -0,0 +1,56 @@
+"""
+Compares the per-frame cost of ImageViewer.draw_frame against the previous PIL based conversion.
+
+Usage: python benchmarks/draw_frame_benchmark.py [--frames 100]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+from PIL.ImageQt import ImageQt
+from PySide2.QtGui import QPixmap
+from PySide2.QtWidgets import QApplication
+
+from MuSeqPose.widgets.ImageViewer import ImageViewer
+
+RESOLUTIONS = {'1080p': (1080, 1920), '4K': (2160, 3840)}
+
+
+def draw_frame_pil(viewer, frame):
+    viewer.pixmap_item.setPixmap(QPixmap.fromImage(ImageQt(Image.fromarray(frame))))
+    viewer.update()
+
+
+def time_per_frame(draw_fn, viewer, frames):
+    draw_fn(viewer, frames[0])
+    start = time.perf_counter()
+    for frame in frames:
+        draw_fn(viewer, frame)
+    QApplication.processEvents()
+    return (time.perf_counter() - start) * 1000 / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=100)
+    args = parser.parse_args()
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QApplication(sys.argv)
+    viewer = ImageViewer()
+    rng = np.random.default_rng(0)
+    print(f'{"resolution":>10} {"PIL (ms)":>10} {"QImage (ms)":>12} {"speedup":>8}')
+    for name, (height, width) in RESOLUTIONS.items():
+        # A handful of distinct frames so every iteration converts fresh data.
+        frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(4)]
+        frames = [frames[i % len(frames)] for i in range(args.frames)]
+        pil_ms = time_per_frame(draw_frame_pil, viewer, frames)
+        qimage_ms = time_per_frame(ImageViewer.draw_frame, viewer, frames)
+        print(f'{name:>10} {pil_ms:>10.2f} {qimage_ms:>12.2f} {pil_ms / qimage_ms:>7.1f}x')
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from MuSeqPose.utils.chunked_datastore import ChunkedDataStore
+from MuSeqPose.utils.columnar_datastore import ColumnarDataStore
+from cvkit.pose_estimation import Part
+from cvkit.pose_estimation.data_readers import initialize_datastore_reader
+
+BODY_PARTS = ['snout', 'left_ear', 'right_ear', 'tail']
+
+
+@pytest.fixture
+def annotation_file(tmp_path):
+    """
+    Deeplabcut file with three decimal values, gaps between frames and some empty behaviour cells.
+    """
+    rng = np.random.default_rng(0)
+    frames = np.concatenate([np.arange(0, 20), np.arange(25, 40), np.arange(50, 53)])
+    columns = pd.MultiIndex.from_tuples(
+        [('test', part, coordinate) for part in BODY_PARTS for coordinate in ('x', 'y', 'likelihood')] +
+        [('test', 'behaviour', 'name')], names=['scorer', 'bodyparts', 'coords'])
+    values = np.round(rng.random((len(frames), len(BODY_PARTS) * 3)) * 100, 3)
+    data = pd.DataFrame(values, index=frames, columns=columns[:-1])
+    data[('test', 'behaviour', 'name')] = np.where(rng.random(len(frames)) < 0.3, 'rearing', '')
+    path = tmp_path / 'annotation.csv'
+    data.to_csv(path)
+    return str(path)
+
+
+def edit(data_store):
+    data_store.set_part(3, Part([12.5, 7.25], 'snout', 1.0))
+    data_store.set_part(30, Part([1.0, 2.0], 'tail', 0.9))
+    data_store.set_part(30, Part([3.0, 4.0], 'tail', 0.8))
+    data_store.set_behaviour(5, ['walk'])
+    data_store.set_behaviour(22, ['rearing'])
+    data_store.set_behaviour_range(36, 45, ['walk', 'rearing'])
+    data_store.delete_part(10, 'left_ear')
+    data_store.set_part_block(np.arange(14, 18), 'right_ear', np.full((4, 2), 5.5), 1.0)
+
+
+@pytest.mark.parametrize('chunk_size', [4, 16, 4096])
+def test_save_matches_eager_store(annotation_file, tmp_path, chunk_size):
+    eager = ColumnarDataStore(initialize_datastore_reader(BODY_PARTS, annotation_file, 'deeplabcut'))
+    chunked = ChunkedDataStore(BODY_PARTS, annotation_file, 'deeplabcut', chunk_size)
+    edit(eager)
+    edit(chunked)
+    for index in range(0, 60):
+        assert sorted(chunked.get_behaviour(index)) == sorted(eager.get_behaviour(index))
+    eager_slice, chunked_slice = eager.get_slice((0, 60)), chunked.get_slice((0, 60))
+    np.testing.assert_array_equal(chunked_slice[1], eager_slice[1])
+    np.testing.assert_array_equal(chunked_slice[0][..., :2], eager_slice[0][..., :2])
+    eager_path, chunked_path = tmp_path / 'eager.csv', tmp_path / 'chunked.csv'
+    eager.save_file(str(eager_path))
+    chunked.save_file(str(chunked_path))
+    chunked.close()
+    assert chunked_path.read_text() == eager_path.read_text()
+
+
+def test_slice_reads_chunks(annotation_file):
+    eager = ColumnarDataStore(initialize_datastore_reader(BODY_PARTS, annotation_file, 'deeplabcut'))
+    chunked = ChunkedDataStore(BODY_PARTS, annotation_file, 'deeplabcut', 8)
+    for start, end in [(0, 60), (18, 27), (40, 50), (51, 70)]:
+        eager_coordinates, eager_likelihood = eager.get_slice((start, end), ['tail', 'snout'])
+        coordinates, likelihood = chunked.get_slice((start, end), ['tail', 'snout'])
+        np.testing.assert_array_equal(likelihood, eager_likelihood)
+        np.testing.assert_array_equal(coordinates, eager_coordinates)
+    chunked.close()
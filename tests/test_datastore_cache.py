@@ -0,0 +1,63 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from MuSeqPose.utils.columnar_datastore import ColumnarDataStore
+from MuSeqPose.utils.datastore_cache import DeferredDataStore
+from MuSeqPose.utils.edit_journal import JournaledDataStore
+from cvkit.pose_estimation import Part
+from cvkit.pose_estimation.data_readers import DataStoreInterface, initialize_datastore_reader
+
+BODY_PARTS = ['snout', 'tail']
+
+
+def write_annotation_file(path):
+    rng = np.random.default_rng(0)
+    columns = pd.MultiIndex.from_tuples(
+        [('test', part, coordinate) for part in BODY_PARTS for coordinate in ('x', 'y', 'likelihood')],
+        names=['scorer', 'bodyparts', 'coords'])
+    data = pd.DataFrame(np.round(rng.random((30, len(BODY_PARTS) * 3)) * 100, 3), columns=columns)
+    data[('test', 'behaviour', 'name')] = ''
+    data.to_csv(path)
+
+
+def edit(data_store):
+    skeleton = data_store.get_skeleton(2)
+    skeleton['tail'] = Part([4.0, 4.5], 'tail', 1.0)
+    data_store.set_skeleton(2, skeleton)
+    # The queued skeleton must not follow later changes of the caller's object.
+    skeleton['tail'] = Part([9.0, 9.0], 'tail', 1.0)
+    data_store.set_part(3, Part([12.5, 7.25], 'snout', 1.0))
+    data_store.set_part_block(np.arange(10, 20), 'tail', np.full((10, 2), 5.5), 1.0)
+    data_store.set_behaviour(4, ['rear'])
+    data_store.set_behaviour_range(5, 8, ['walk'])
+    data_store.delete_part(21, 'snout')
+    data_store.delete_skeleton(22)
+
+
+def test_writes_wait_only_for_save(tmp_path):
+    eager_path, deferred_path = str(tmp_path / 'eager.csv'), str(tmp_path / 'deferred.csv')
+    write_annotation_file(eager_path)
+    write_annotation_file(deferred_path)
+    eager = ColumnarDataStore(JournaledDataStore(initialize_datastore_reader(BODY_PARTS, eager_path, 'deeplabcut')))
+
+    def slow_factory():
+        time.sleep(0.5)
+        return initialize_datastore_reader(BODY_PARTS, deferred_path, 'deeplabcut')
+
+    cache = {'coordinates': eager.coordinates.copy(), 'likelihood': eager.likelihood.copy(),
+             'row_mask': eager.row_mask.copy(), 'behaviour_codes': eager.behaviour_codes.copy(),
+             'behaviour_sets': np.array([''])}
+    data_store = DeferredDataStore(slow_factory, BODY_PARTS, deferred_path, 'deeplabcut', 3,
+                                   DataStoreInterface.BEHAVIOUR_SEP)
+    deferred = ColumnarDataStore(JournaledDataStore(data_store), cache)
+    edit(eager)
+    edit(deferred)
+    assert data_store.data_store is None
+    np.testing.assert_array_equal(deferred.get_slice((0, 30))[0], eager.get_slice((0, 30))[0])
+    eager.close()
+    deferred.close()
+    assert open(deferred_path).read() == open(eager_path).read()
+    assert not os.path.exists(f'{deferred_path}.journal')
@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from MuSeqPose.utils.edit_journal import JournaledDataStore, get_checkpoint_path, get_journal_path
+from cvkit.pose_estimation import Part
+from cvkit.pose_estimation.data_readers import initialize_datastore_reader
+
+BODY_PARTS = ['snout', 'tail']
+
+
+@pytest.fixture
+def annotation_file(tmp_path):
+    rng = np.random.default_rng(0)
+    columns = pd.MultiIndex.from_tuples(
+        [('test', part, coordinate) for part in BODY_PARTS for coordinate in ('x', 'y', 'likelihood')],
+        names=['scorer', 'bodyparts', 'coords'])
+    data = pd.DataFrame(np.round(rng.random((30, len(BODY_PARTS) * 3)) * 100, 3), columns=columns)
+    data[('test', 'behaviour', 'name')] = ''
+    path = tmp_path / 'annotation.csv'
+    data.to_csv(path)
+    return str(path)
+
+
+def open_store(path, **kwargs):
+    return JournaledDataStore(initialize_datastore_reader(BODY_PARTS, path, 'deeplabcut'), **kwargs)
+
+
+def edit(data_store):
+    data_store.set_part(3, Part([12.5, 7.25], 'snout', 1.0))
+    data_store.set_part_block(np.arange(10, 20), 'tail', np.full((10, 2), 5.5), 1.0)
+    data_store.set_behaviour_range(5, 8, ['walk'])
+
+
+def assert_edited(data_store):
+    assert data_store.get_part(3, 'snout').tolist() == [12.5, 7.25]
+    assert data_store.get_part(15, 'tail').tolist() == [5.5, 5.5]
+    assert data_store.get_behaviour(6) == ['walk']
+
+
+def sidecar_paths(path):
+    journal_path = get_journal_path(path)
+    return [journal_path, f'{journal_path}.compacting', get_checkpoint_path(journal_path)]
+
+
+def crash(data_store):
+    # Leaves the journal and checkpoint on disk as a killed process would.
+    if data_store.compaction_thread is not None:
+        data_store.compaction_thread.join()
+    data_store.flush()
+    data_store.journal.close()
+
+
+def test_replay_after_crash(annotation_file):
+    data_store = open_store(annotation_file)
+    edit(data_store)
+    crash(data_store)
+    restored = open_store(annotation_file)
+    assert_edited(restored)
+    restored.close()
+    assert not any(os.path.exists(path) for path in sidecar_paths(annotation_file))
+    assert_edited(open_store(annotation_file))
+
+
+def test_checkpoint_keeps_annotation_file(annotation_file):
+    original = open(annotation_file).read()
+    data_store = open_store(annotation_file, max_journal_size=1)
+    edit(data_store)
+    data_store.compaction_thread.join()
+    assert open(annotation_file).read() == original
+    assert os.path.exists(get_checkpoint_path(get_journal_path(annotation_file)))
+    assert data_store.has_pending_edits()
+    crash(data_store)
+    restored = open_store(annotation_file, max_journal_size=1)
+    assert_edited(restored)
+    restored.close(discard=True)
+    assert open(annotation_file).read() == original
+    assert not any(os.path.exists(path) for path in sidecar_paths(annotation_file))
+
+
+def test_save_folds_checkpoint(annotation_file):
+    data_store = open_store(annotation_file, max_journal_size=1)
+    edit(data_store)
+    data_store.save_file()
+    data_store.compaction_thread.join()
+    assert not data_store.has_pending_edits()
+    data_store.set_part(4, Part([1.0, 2.0], 'tail', 1.0))
+    data_store.close(discard=True)
+    assert not any(os.path.exists(path) for path in sidecar_paths(annotation_file))
+    saved = open_store(annotation_file)
+    assert_edited(saved)
+    assert saved.get_part(4, 'tail').tolist() != [1.0, 2.0]